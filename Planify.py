@@ -4,14 +4,34 @@ Planify - Advanced AI Study Planner
 
 import streamlit as st
 import pandas as pd
+import numpy as np
+import asyncio
+import concurrent.futures
+import contextlib
+import hashlib
+import heapq
+import html
+import importlib
 import json
 import os
 import io
+import queue
+import itertools
+import threading
 import time
 import random
 import base64
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+import bisect
+import contextvars
+import re
+import sqlite3
+import struct
+import zipfile
+import zlib
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from xml.sax.saxutils import escape as xml_escape
 
 # Import required libraries
 from dotenv import load_dotenv
@@ -21,6 +41,8 @@ from fpdf import FPDF
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
 import xlsxwriter
 from PIL import Image, ImageDraw, ImageFont
 import streamlit.components.v1 as components
@@ -479,521 +501,2963 @@ def load_lottie_animation():
     """
     return lottie_code
 
+# ==================== RESPONSE CACHE ====================
+class LRUCache:
+    """Thread-safe in-memory LRU cache with hit/miss counters
+    
+    Bounded on entry count, or on total payload size when ``max_bytes``
+    and a ``sizeof`` function are given (either bound may be None).
+    """
+    
+    def __init__(self, max_entries: Optional[int] = 256, max_bytes: Optional[int] = None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        """Return cached value and mark it most recently used"""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+    
+    def set(self, key, value):
+        """Store value, evicting the least recently used entries
+        
+        A value larger than ``max_bytes`` on its own is not kept, and does
+        not evict anything.
+        """
+        size = self.sizeof(value) if self.sizeof else 0
+        with self._lock:
+            if self.max_bytes is not None and size > self.max_bytes:
+                # Evicting everything else would not make room; drop any stale copy only
+                if key in self._data:
+                    del self._data[key]
+                    self.bytes -= self._sizes.pop(key)
+                return
+            self.bytes += size - self._sizes.get(key, 0)
+            self._data[key] = value
+            self._sizes[key] = size
+            self._data.move_to_end(key)
+            while self._data and ((self.max_entries is not None and len(self._data) > self.max_entries)
+                                  or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+                evicted, _ = self._data.popitem(last=False)
+                self.bytes -= self._sizes.pop(evicted)
+    
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.bytes = 0
+    
+    def __len__(self):
+        return len(self._data)
+    
+    @property
+    def stats(self) -> Dict:
+        """Consistent snapshot of the counters, taken under the lock"""
+        with self._lock:
+            return {'entries': len(self._data), 'bytes': self.bytes, 'hits': self.hits, 'misses': self.misses}
+
+class ResponseCache:
+    """LLM response cache: in-memory LRU tier plus optional SQLite tier
+    
+    The disk tier is enabled by passing ``db_path`` (or setting
+    PLANIFY_CACHE_DB). Disk entries expire after ``ttl`` seconds and the
+    table is trimmed to ``max_db_entries`` least recently used rows.
+    """
+    
+    def __init__(self, max_entries: int = 512, db_path: str = None,
+                 ttl: float = 7 * 24 * 3600, max_db_entries: int = 50000):
+        self.memory = LRUCache(max_entries)
+        self.ttl = ttl
+        self.max_db_entries = max_db_entries
+        self._stats = {'hits': 0, 'misses': 0, 'memory_hits': 0, 'disk_hits': 0}
+        self._stats_lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._writes = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._db.commit()
+    
+    @classmethod
+    def from_env(cls) -> 'ResponseCache':
+        """Build a cache configured from PLANIFY_CACHE_* environment variables"""
+        return cls(
+            max_entries=int(os.getenv('PLANIFY_CACHE_SIZE', '512')),
+            db_path=os.getenv('PLANIFY_CACHE_DB') or None,
+            ttl=float(os.getenv('PLANIFY_CACHE_TTL', str(7 * 24 * 3600)))
+        )
+    
+    @staticmethod
+    def key(system: str, context: List, prompt: str, model: str, temperature: float) -> str:
+        """Normalized hash of everything that determines a completion"""
+        def norm(text) -> str:
+            return ' '.join(str(text).split())
+        
+        payload = json.dumps({
+            'system': norm(system),
+            'context': [[m.get('role'), norm(m.get('content', ''))] for m in context],
+            'prompt': norm(prompt),
+            'model': model,
+            'temperature': round(float(temperature), 3)
+        }, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Look up a response, promoting disk hits into memory"""
+        value = self.memory.get(key)
+        if value is not None:
+            self._count('hits', 'memory_hits')
+            return value
+        
+        if self._db is not None:
+            now = time.time()
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row and now - row[1] <= self.ttl:
+                    self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    value = row[0]
+                elif row:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+            if value is not None:
+                self.memory.set(key, value)
+                self._count('hits', 'disk_hits')
+                return value
+        
+        self._count('misses')
+        return None
+    
+    def _count(self, *names: str):
+        with self._stats_lock:
+            for name in names:
+                self._stats[name] += 1
+    
+    @property
+    def stats(self) -> Dict:
+        """Snapshot of the hit/miss counters, taken under the counter lock"""
+        with self._stats_lock:
+            return dict(self._stats)
+    
+    def set(self, key: str, value: str):
+        """Store a response in both tiers"""
+        self.memory.set(key, value)
+        if self._db is None:
+            return
+        now = time.time()
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            self._writes += 1
+            # Amortize eviction: expire and trim every 100 writes
+            if self._writes % 100 == 0:
+                self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_db_entries,)
+                )
+            self._db.commit()
+
+@st.cache_resource(show_spinner=False)
+def get_response_cache() -> ResponseCache:
+    """Shared LLM response cache, created once per server process"""
+    return ResponseCache.from_env()
+
+# ==================== CONTEXT WINDOW ====================
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators per chat message
+
+def count_tokens(text: str) -> int:
+    """Approximate BPE token count without a model-specific tokenizer
+    
+    Punctuation counts as one token and words as one token per four
+    characters, which tracks the Llama/GPT tokenizers closely for
+    English prose.
+    """
+    return sum((len(match) + 3) // 4 for match in TOKEN_PATTERN.findall(str(text)))
+
+def truncate_tokens(text: str, max_tokens: int, keep: str = 'head') -> str:
+    """Cut text to at most ``max_tokens`` tokens, keeping its head or tail"""
+    spans = [(m.start(), m.end(), (m.end() - m.start() + 3) // 4) for m in TOKEN_PATTERN.finditer(text)]
+    if sum(span[2] for span in spans) <= max_tokens:
+        return text
+    if keep == 'tail':
+        spans.reverse()
+    used = 1  # the ellipsis marking the cut
+    cut = 0 if keep == 'head' else len(text)
+    for start, end, cost in spans:
+        if used + cost > max_tokens:
+            break
+        used += cost
+        cut = end if keep == 'head' else start
+    return text[:cut].rstrip() + " …" if keep == 'head' else "… " + text[cut:].lstrip()
+
+class ContextWindow:
+    """Fit conversation history into a prompt token budget
+    
+    The newest turns are kept verbatim. Older turns that no longer fit are
+    folded into a short extractive summary (first sentence of each turn)
+    sent as a system note, and a single oversized turn is truncated.
+    """
+    
+    def __init__(self, budget: int = 1500, summary_share: float = 0.2):
+        self.budget = budget
+        self.summary_share = summary_share
+    
+    def fit(self, system: str, context: List, prompt: str) -> Tuple[List[Dict], Dict]:
+        """Return messages for the request and their token accounting"""
+        def cost(content) -> int:
+            return count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+        
+        usage = {
+            'budget': self.budget,
+            'system': cost(system),
+            'prompt': cost(prompt),
+            'context': 0,
+            'summary': 0,
+            'kept_messages': 0,
+            'summarized_messages': 0,
+            'truncated_messages': 0
+        }
+        available = max(0, self.budget - usage['system'] - usage['prompt'])
+        
+        # Keep the newest turns that fit
+        kept = []
+        remaining = available
+        history = list(context or [])
+        while history:
+            message = history[-1]
+            message_cost = cost(message.get('content', ''))
+            if message_cost <= remaining:
+                kept.append(message)
+                remaining -= message_cost
+                history.pop()
+            elif not kept and remaining > MESSAGE_OVERHEAD_TOKENS:
+                # The latest turn alone is too long: keep its tail
+                content = truncate_tokens(str(message.get('content', '')),
+                                          remaining - MESSAGE_OVERHEAD_TOKENS, keep='tail')
+                kept.append({**message, 'content': content})
+                remaining -= cost(content)
+                usage['truncated_messages'] += 1
+                history.pop()
+            else:
+                break
+        kept.reverse()
+        usage['context'] = available - remaining
+        
+        # Fold whatever did not fit into a summary note
+        summary = None
+        prefix = "Earlier in this conversation: "
+        summary_budget = min(remaining, int(self.budget * self.summary_share))
+        summary_budget -= MESSAGE_OVERHEAD_TOKENS + count_tokens(prefix)
+        if history and summary_budget >= 16:
+            lines = []
+            for message in history:
+                first_sentence = re.split(r'(?<=[.!?])\s', ' '.join(str(message.get('content', '')).split()), 1)[0]
+                lines.append(f"{message.get('role', 'user')}: {truncate_tokens(first_sentence, 24)}")
+            # Keep the most recent of the dropped turns when the summary overflows
+            text = prefix + truncate_tokens(" | ".join(lines), summary_budget, keep='tail')
+            summary = {"role": "system", "content": text}
+            usage['summary'] = cost(text)
+            usage['summarized_messages'] = len(history)
+        
+        messages = [{"role": "system", "content": system}]
+        if summary:
+            messages.append(summary)
+        messages.extend(kept)
+        messages.append({"role": "user", "content": prompt})
+        
+        usage['kept_messages'] = len(kept)
+        usage['total'] = usage['system'] + usage['prompt'] + usage['context'] + usage['summary']
+        return messages, usage
+
+# ==================== OFFLINE INTENTS ====================
+INTENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'offline_intents.json')
+WORD_PATTERN = re.compile(r"\w+")
+
+class IntentIndex:
+    """Precompiled keyword index over the canned offline responses
+    
+    Keywords (words or short phrases) map to (intent, weight) postings.
+    A prompt is tokenized once and each of its n-grams is looked up, so
+    matching cost depends on the prompt length, not the number of intents.
+    Intents are ranked by the summed weight of distinct matched keywords,
+    ties going to the intent listed first in the data file.
+    """
+    
+    def __init__(self, intents: List[Dict], default: str):
+        self.intents = intents
+        self.default = default
+        self.postings: Dict[Tuple[str, ...], List[Tuple[int, float]]] = {}
+        self.max_ngram = 1
+        for position, intent in enumerate(intents):
+            for keyword, weight in intent['keywords'].items():
+                words = tuple(WORD_PATTERN.findall(keyword.lower()))
+                if words:
+                    self.postings.setdefault(words, []).append((position, float(weight)))
+                    self.max_ngram = max(self.max_ngram, len(words))
+    
+    @classmethod
+    def from_file(cls, path: str = INTENTS_PATH) -> 'IntentIndex':
+        """Load intents from a JSON data file"""
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['intents'], data['default'])
+    
+    def rank(self, text: str, limit: int = 3) -> List[Tuple[float, Dict]]:
+        """Best matching intents for text, highest score first"""
+        words = WORD_PATTERN.findall(text.lower())
+        scores = {}
+        seen = set()
+        for start in range(len(words)):
+            for size in range(1, min(self.max_ngram, len(words) - start) + 1):
+                gram = tuple(words[start:start + size])
+                postings = self.postings.get(gram)
+                if postings is None and size == 1 and gram[0].endswith('s'):
+                    # Cheap plural folding: "names" matches "name"
+                    gram = (gram[0][:-1],)
+                    postings = self.postings.get(gram)
+                if not postings or gram in seen:
+                    continue
+                seen.add(gram)
+                for position, weight in postings:
+                    scores[position] = scores.get(position, 0.0) + weight
+        
+        best = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(score, self.intents[position]) for position, score in best]
+    
+    def match(self, text: str) -> str:
+        """Response of the best matching intent, or the default reply"""
+        ranked = self.rank(text, limit=1)
+        return ranked[0][1]['response'] if ranked else self.default
+
+@st.cache_resource(show_spinner=False)
+def get_intent_index() -> IntentIndex:
+    """Offline intent index, built once per server process"""
+    return IntentIndex.from_file()
+
 # ==================== AI PROVIDER CLASS ====================
+CHAT_SETTINGS = {
+    'groq': {
+        'label': "Groq AI",
+        'api_key_env': 'GROQ_API_KEY',
+        'model': "llama-3.3-70b-versatile",
+        'system': "You are Planify, a friendly AI study planner assistant. Help students create personalized study schedules.",
+        'temperature': 0.7,
+        'max_tokens': 1000
+    },
+    'openai': {
+        'label': "OpenAI",
+        'api_key_env': 'OPENAI_API_KEY',
+        'model': "gpt-3.5-turbo",
+        'system': "You are Planify, a friendly AI study planner assistant.",
+        'temperature': 0.7,
+        'max_tokens': 500
+    }
+}
+
+# Upstream limits; a hung request must not hold a script thread
+CONNECT_TIMEOUT = float(os.getenv('PLANIFY_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.getenv('PLANIFY_READ_TIMEOUT', '30'))
+MAX_RETRIES = int(os.getenv('PLANIFY_MAX_RETRIES', '2'))
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 4.0
+
+# Per-request prompt token accounting (contextvar: one value per thread or task)
+_token_usage = contextvars.ContextVar('planify_token_usage', default=None)
+
+class CircuitBreaker:
+    """Per-provider circuit breaker
+    
+    Opens after ``failure_threshold`` consecutive failures and rejects
+    calls for ``reset_timeout`` seconds. After that a single trial call is
+    let through (half-open); its outcome closes or re-opens the circuit.
+    A trial that reports nothing within ``trial_timeout`` seconds is
+    considered lost and another one is let through.
+    """
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 trial_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.trial_timeout = trial_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_started = None
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+    
+    def allow(self) -> bool:
+        """Whether a call may go upstream right now"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            now = time.monotonic()
+            if state == 'half-open' and (self._trial_started is None
+                                         or now - self._trial_started >= self.trial_timeout):
+                self._trial_started = now
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_started = None
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_started is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_started = None
+    
+    def release(self):
+        """End a call that gave no verdict (e.g. an abandoned stream)"""
+        with self._lock:
+            self._trial_started = None
+
 class AIProvider:
-    """Unified AI Provider for Groq and OpenAI"""
+    """Unified AI Provider for Groq and OpenAI
+    
+    Every configured backend is tried in CHAT_SETTINGS order, so OpenAI
+    takes over when Groq is failing. Each backend has its own circuit
+    breaker; when all are open, replies come from the offline responder.
+    """
+    
+    CLIENT_CLASSES = {'groq': ('groq', 'Groq'), 'openai': ('openai', 'OpenAI')}
     
-    def __init__(self):
+    def __init__(self, cache: ResponseCache = None):
         self.provider = None
         self.client = None
+        self.clients = {}
+        self.breakers = {}
+        self.status = ''
+        self.cache = cache if cache is not None else ResponseCache()
+        self.context_window = ContextWindow(int(os.getenv('PLANIFY_CONTEXT_TOKENS', '1500')))
+        self.ttft_samples = deque(maxlen=500)
+        self._connection_errors = ()
         self._initialize()
     
     def _initialize(self):
-        """Initialize available AI provider"""
-        # Try Groq first
-        if os.getenv('GROQ_API_KEY'):
-            try:
-                from groq import Groq
-                self.client = Groq(api_key=os.getenv('GROQ_API_KEY'))
-                self.provider = 'groq'
-                st.success("✅ Connected to Groq AI")
-            except Exception as e:
-                st.warning(f"Groq initialization failed: {e}")
+        """Initialize available AI providers
         
-        # Try OpenAI if Groq not available
-        if not self.provider and os.getenv('OPENAI_API_KEY'):
+        Runs once per process (see get_ai_provider). The SDK clients pool
+        keep-alive connections and are safe to share across sessions.
+        Retries are handled here, so the SDKs' own retries are disabled.
+        """
+        problems = []
+        for name, settings in CHAT_SETTINGS.items():
+            api_key = os.getenv(settings['api_key_env'])
+            if not api_key:
+                continue
+            module_name, class_name = self.CLIENT_CLASSES[name]
             try:
-                import openai
-                openai.api_key = os.getenv('OPENAI_API_KEY')
-                self.client = openai
-                self.provider = 'openai'
-                st.success("✅ Connected to OpenAI")
+                module = importlib.import_module(module_name)
+                self.clients[name] = getattr(module, class_name)(
+                    api_key=api_key,
+                    timeout=module.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                    max_retries=0
+                )
+                self.breakers[name] = CircuitBreaker()
+                self._connection_errors += (module.APIConnectionError,)
             except Exception as e:
-                st.warning(f"OpenAI initialization failed: {e}")
+                problems.append(f"{settings['label']} initialization failed: {e}")
         
-        # Fallback mode
-        if not self.provider:
+        if self.clients:
+            self.provider = next(iter(self.clients))
+            self.client = self.clients[self.provider]
+            labels = [CHAT_SETTINGS[name]['label'] for name in self.clients]
+            self.status = f"✅ Connected to {labels[0]}"
+            if len(labels) > 1:
+                self.status += f" ({', '.join(labels[1:])} failover)"
+        else:
+            # Fallback mode
             self.provider = 'offline'
-            st.info("ℹ️ Running in offline mode")
+            self.status = "ℹ️ Running in offline mode"
+            if problems:
+                self.status += f" — {'; '.join(problems)}"
     
     def chat(self, prompt: str, context: List = None) -> str:
         """Get AI response"""
-        if self.provider == 'groq':
-            return self._groq_chat(prompt, context)
-        elif self.provider == 'openai':
-            return self._openai_chat(prompt, context)
+        for name in self.clients:
+            request, usage = self._request(prompt, context, name)
+            key = self._cache_key(request)
+            cached = self.cache.get(key)
+            if cached is not None:
+                _token_usage.set(usage)
+                return cached
+            if not self.breakers[name].allow():
+                continue
+            
+            try:
+                reply = self._with_retries(lambda: self._complete(name, request))
+            except Exception:
+                self.breakers[name].record_failure()
+                continue
+            self.breakers[name].record_success()
+            self.cache.set(key, reply)
+            _token_usage.set(usage)
+            return reply
+        
+        _token_usage.set(None)
+        return self._offline_response(prompt)
+    
+    def chat_stream(self, prompt: str, context: List = None) -> Iterator[str]:
+        """Stream AI response as text deltas
+        
+        Records time-to-first-token in ``ttft_samples`` (milliseconds).
+        Cache hits are yielded as a single delta. A backend that fails
+        before its first delta fails over to the next one.
+        """
+        started = time.perf_counter()
+        for name in self.clients:
+            request, usage = self._request(prompt, context, name)
+            key = self._cache_key(request)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.ttft_samples.append((time.perf_counter() - started) * 1000)
+                _token_usage.set(usage)
+                yield cached
+                return
+            if not self.breakers[name].allow():
+                continue
+            
+            parts = []
+            finished = False
+            try:
+                stream = self._with_retries(lambda: self._open_stream(name, request))
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if not parts:
+                            self.ttft_samples.append((time.perf_counter() - started) * 1000)
+                            _token_usage.set(usage)
+                        parts.append(chunk.choices[0].delta.content)
+                        yield parts[-1]
+                finished = True
+            except Exception:
+                finished = True
+                self.breakers[name].record_failure()
+                # Nothing to take back once text is on screen
+                if parts:
+                    return
+                continue
+            finally:
+                # A reader that stops early (GeneratorExit) must not hold the trial
+                if not finished:
+                    self.breakers[name].release()
+            
+            self.breakers[name].record_success()
+            if parts:
+                self.cache.set(key, ''.join(parts))
+                return
+        
+        self.ttft_samples.append((time.perf_counter() - started) * 1000)
+        _token_usage.set(None)
+        yield self._offline_response(prompt)
+    
+    @property
+    def last_token_usage(self) -> Optional[Dict]:
+        """Prompt token accounting of the request behind this thread/task's latest reply
+        
+        It is the prompt sent to the backend that answered (or whose cached
+        reply was used); None after an offline reply.
+        """
+        return _token_usage.get()
+    
+    def _request(self, prompt: str, context: List, provider: str = None) -> Tuple[Dict, Dict]:
+        """Completion arguments for a provider and their prompt token accounting"""
+        settings = CHAT_SETTINGS[provider or self.provider]
+        messages, usage = self.context_window.fit(settings['system'], context, prompt)
+        return {
+            'model': settings['model'],
+            'messages': messages,
+            'temperature': settings['temperature'],
+            'max_tokens': settings['max_tokens']
+        }, usage
+    
+    def _cache_key(self, request: Dict) -> str:
+        """Response cache key for completion arguments"""
+        messages = request['messages']
+        return ResponseCache.key(messages[0]['content'], messages[1:-1], messages[-1]['content'],
+                                 request['model'], request['temperature'])
+    
+    def _complete(self, provider: str, request: Dict) -> str:
+        """Chat using one provider (Groq and OpenAI share one API shape)"""
+        response = self.clients[provider].chat.completions.create(**request)
+        return response.choices[0].message.content
+    
+    def _open_stream(self, provider: str, request: Dict):
+        """Open a streaming completion on one provider"""
+        return self.clients[provider].chat.completions.create(stream=True, **request)
+    
+    def _is_retryable(self, error: Exception) -> bool:
+        """Rate limits, server errors, timeouts and dropped connections"""
+        status = getattr(error, 'status_code', None)
+        if status is not None:
+            return status == 429 or status >= 500
+        return isinstance(error, self._connection_errors)
+    
+    def _retry_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+    
+    def _with_retries(self, call):
+        """Run call(), retrying transient upstream errors"""
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                return call()
+            except Exception as e:
+                if attempt == MAX_RETRIES or not self._is_retryable(e):
+                    raise
+                time.sleep(self._retry_delay(attempt))
+    
+    def _offline_response(self, prompt: str) -> str:
+        """Offline fallback responses"""
+        return get_intent_index().match(prompt)
+
+@st.cache_resource(show_spinner=False)
+def get_ai_provider() -> AIProvider:
+    """Shared AI provider, created once per server process"""
+    return AIProvider(get_response_cache())
+
+class AsyncAIProvider:
+    """Asyncio front end for an AIProvider with a concurrency limit and request coalescing
+    
+    Upstream calls run on the provider's own event loop thread, which also
+    owns the semaphore, the in-flight map and the async SDK clients; every
+    entry point hands its work to that loop. At most ``max_concurrency``
+    upstream requests run at once, and identical prompts that arrive while
+    one is in flight share it: ``chat`` callers share the reply and
+    ``chat_stream`` readers share one upstream stream (a late reader first
+    gets the text streamed so far). Circuit breakers, the response cache
+    and TTFT samples are those of the wrapped provider.
+    """
+    
+    CLIENT_CLASSES = {'groq': ('groq', 'AsyncGroq'), 'openai': ('openai', 'AsyncOpenAI')}
+    
+    def __init__(self, provider: AIProvider, max_concurrency: int = None):
+        self.provider = provider
+        self.max_concurrency = max_concurrency or int(os.getenv('PLANIFY_MAX_CONCURRENCY', '8'))
+        self.metrics = {
+            'requests': 0,
+            'upstream_calls': 0,
+            'coalesced': 0,
+            'in_flight': 0,
+            'waiting': 0,
+            'peak_waiting': 0
+        }
+        self.clients = {}
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="planify-ai-loop", daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+    
+    @property
+    def status(self) -> str:
+        return self.provider.status
+    
+    @property
+    def last_token_usage(self) -> Optional[Dict]:
+        """Prompt token accounting of the request behind this thread/task's latest reply"""
+        return self.provider.last_token_usage
+    
+    async def chat(self, prompt: str, context: List = None) -> str:
+        """Get AI response; awaitable from any event loop"""
+        requests, keys, usages = self._requests(prompt, context)
+        reply, backend = await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(self._chat(prompt, requests, keys), self._loop))
+        _token_usage.set(usages.get(backend))
+        return reply
+    
+    def submit(self, prompt: str, context: List = None) -> concurrent.futures.Future:
+        """Schedule a chat request on the provider's event loop from any thread
+        
+        The future resolves to the reply text; token usage is only reported
+        by chat and chat_stream.
+        """
+        requests, keys, _ = self._requests(prompt, context)
+        return asyncio.run_coroutine_threadsafe(self._reply(prompt, requests, keys), self._loop)
+    
+    def chat_stream(self, prompt: str, context: List = None) -> Iterator[str]:
+        """Stream AI response as text deltas
+        
+        Same contract as AIProvider.chat_stream. The upstream stream runs on
+        the provider's loop and holds a concurrency slot until it ends or
+        every reader sharing it has stopped.
+        """
+        started = time.perf_counter()
+        requests, keys, usages = self._requests(prompt, context)
+        deltas = queue.Queue()
+        shared = asyncio.run_coroutine_threadsafe(self._join_stream(requests, keys, deltas), self._loop).result()
+        streamed = False
+        try:
+            for delta in iter(deltas.get, None):
+                if not streamed:
+                    self.provider.ttft_samples.append((time.perf_counter() - started) * 1000)
+                    # The answering backend is known once its first delta arrives
+                    _token_usage.set(usages.get(shared['backend']))
+                    streamed = True
+                yield delta
+        finally:
+            if 'key' in shared:
+                self._loop.call_soon_threadsafe(self._leave_stream, shared['key'], deltas)
+        
+        if not streamed:
+            self.provider.ttft_samples.append((time.perf_counter() - started) * 1000)
+            _token_usage.set(None)
+            yield self.provider._offline_response(prompt)
+    
+    def queue_depth(self) -> int:
+        """Requests waiting for a free upstream slot"""
+        return self.metrics['waiting']
+    
+    def _requests(self, prompt: str, context: List) -> Tuple[Dict, Dict, Dict]:
+        """Completion arguments, cache keys and token usage per backend, in failover order"""
+        requests, usages = {}, {}
+        for name in self.clients:
+            requests[name], usages[name] = self.provider._request(prompt, context, name)
+        keys = {name: self.provider._cache_key(request) for name, request in requests.items()}
+        return requests, keys, usages
+    
+    async def _start(self):
+        """Create the loop-bound state on the provider's own loop"""
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._streams: Dict[str, Dict] = {}
+        for name in self.provider.clients:
+            module_name, class_name = self.CLIENT_CLASSES[name]
+            try:
+                module = importlib.import_module(module_name)
+                self.clients[name] = getattr(module, class_name)(
+                    api_key=os.getenv(CHAT_SETTINGS[name]['api_key_env']),
+                    timeout=module.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                    max_retries=0
+                )
+            except Exception:
+                continue
+    
+    @contextlib.asynccontextmanager
+    async def _slot(self):
+        """Hold one of the ``max_concurrency`` upstream slots"""
+        self.metrics['waiting'] += 1
+        self.metrics['peak_waiting'] = max(self.metrics['peak_waiting'], self.metrics['waiting'])
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.metrics['waiting'] -= 1
+        self.metrics['in_flight'] += 1
+        try:
+            yield
+        finally:
+            self.metrics['in_flight'] -= 1
+            self._semaphore.release()
+    
+    async def _reply(self, prompt: str, requests: Dict, keys: Dict) -> str:
+        return (await self._chat(prompt, requests, keys))[0]
+    
+    async def _chat(self, prompt: str, requests: Dict, keys: Dict) -> Tuple[str, Optional[str]]:
+        """(reply, answering backend) for one request, sharing the upstream call with identical requests
+        
+        The backend is None for offline replies.
+        """
+        self.metrics['requests'] += 1
+        for name, key in keys.items():
+            cached = self.provider.cache.get(key)
+            if cached is not None:
+                return cached, name
+        if not requests:
+            return self.provider._offline_response(prompt), None
+        
+        # The primary backend's key identifies the request for coalescing
+        key = next(iter(keys.values()))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._limited_chat(requests, keys))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.metrics['coalesced'] += 1
+        # Shield so one cancelled caller does not cancel the shared request
+        answer = await asyncio.shield(task)
+        return answer if answer is not None else (self.provider._offline_response(prompt), None)
+    
+    async def _limited_chat(self, requests: Dict, keys: Dict) -> Optional[Tuple[str, str]]:
+        """Run one request under the concurrency limit, failing over in order
+        
+        Returns (reply, backend), or None when every backend failed or had
+        its circuit open.
+        """
+        async with self._slot():
+            for name, request in requests.items():
+                breaker = self.provider.breakers[name]
+                if not breaker.allow():
+                    continue
+                self.metrics['upstream_calls'] += 1
+                try:
+                    reply = await self._with_retries(lambda: self._complete(name, request))
+                except asyncio.CancelledError:
+                    breaker.release()
+                    raise
+                except Exception:
+                    breaker.record_failure()
+                    continue
+                breaker.record_success()
+                self.provider.cache.set(keys[name], reply)
+                return reply, name
+            return None
+    
+    async def _join_stream(self, requests: Dict, keys: Dict, deltas: queue.Queue) -> Dict:
+        """Feed ``deltas`` from the in-flight stream for this request, starting one if needed
+        
+        Returns the shared stream: its 'key' and, once text flows, the
+        answering 'backend'. Cache hits and the no-backend case return only
+        'backend', with ``deltas`` already complete.
+        """
+        self.metrics['requests'] += 1
+        for name, cache_key in keys.items():
+            cached = self.provider.cache.get(cache_key)
+            if cached is not None:
+                deltas.put(cached)
+                deltas.put(None)
+                return {'backend': name}
+        if not requests:
+            deltas.put(None)
+            return {'backend': None}
+        
+        # The primary backend's key identifies the request for coalescing
+        key = next(iter(keys.values()))
+        shared = self._streams.get(key)
+        if shared is None:
+            shared = self._streams[key] = {'key': key, 'backend': None, 'parts': [], 'readers': set()}
+            shared['task'] = asyncio.ensure_future(self._stream(key, requests, keys, shared))
+        else:
+            self.metrics['coalesced'] += 1
+            for part in shared['parts']:
+                deltas.put(part)
+        shared['readers'].add(deltas)
+        return shared
+    
+    def _leave_stream(self, key: str, deltas: queue.Queue):
+        """Detach a reader; the upstream stream is cancelled once it has none"""
+        shared = self._streams.get(key)
+        if shared is None or deltas not in shared['readers']:
+            return
+        shared['readers'].discard(deltas)
+        if not shared['readers']:
+            shared['task'].cancel()
+    
+    async def _stream(self, key: str, requests: Dict, keys: Dict, shared: Dict):
+        """Stream one request under the concurrency limit to every reader of ``shared``
+        
+        Fails over like AIProvider.chat_stream; each reader gets None when done.
+        """
+        def publish(delta, backend):
+            shared['backend'] = backend
+            shared['parts'].append(delta)
+            for reader in shared['readers']:
+                reader.put(delta)
+        
+        try:
+            async with self._slot():
+                for name, request in requests.items():
+                    breaker = self.provider.breakers[name]
+                    if not breaker.allow():
+                        continue
+                    self.metrics['upstream_calls'] += 1
+                    parts = shared['parts']
+                    finished = False
+                    try:
+                        stream = await self._with_retries(lambda: self._open_stream(name, request))
+                        async for chunk in stream:
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                publish(chunk.choices[0].delta.content, name)
+                        finished = True
+                    except Exception:
+                        finished = True
+                        breaker.record_failure()
+                        # Nothing to take back once text is on screen
+                        if parts:
+                            return
+                        continue
+                    finally:
+                        # A reader that stops early cancels us; free the trial
+                        if not finished:
+                            breaker.release()
+                    
+                    breaker.record_success()
+                    if parts:
+                        self.provider.cache.set(keys[name], ''.join(parts))
+                        return
+        finally:
+            # Unlisted before the readers are released, so no one joins a finished stream
+            self._streams.pop(key, None)
+            for reader in shared['readers']:
+                reader.put(None)
+    
+    async def _with_retries(self, call):
+        """Await call(), retrying transient upstream errors"""
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                return await call()
+            except Exception as e:
+                if attempt == MAX_RETRIES or not self.provider._is_retryable(e):
+                    raise
+                await asyncio.sleep(self.provider._retry_delay(attempt))
+    
+    async def _complete(self, provider: str, request: Dict) -> str:
+        """Chat using one async provider"""
+        response = await self.clients[provider].chat.completions.create(**request)
+        return response.choices[0].message.content
+    
+    async def _open_stream(self, provider: str, request: Dict):
+        """Open a streaming completion on one async provider"""
+        return await self.clients[provider].chat.completions.create(stream=True, **request)
+
+@st.cache_resource(show_spinner=False)
+def get_async_ai_provider() -> AsyncAIProvider:
+    """Shared async AI provider, created once per server process"""
+    return AsyncAIProvider(get_ai_provider())
+
+# ==================== SCHEDULE GENERATOR ====================
+MINUTES_PER_DAY = 24 * 60
+CLOCK_LABELS = np.array([f'{m // 60:02d}:{m % 60:02d}' for m in range(MINUTES_PER_DAY)], dtype=object)
+
+# Fixed daily rows: (Activity, minutes, Type, Energy Level)
+DAILY_ROWS = {
+    'wake': ('🌅 Wake Up & Morning Routine', 30, 'Personal', '🔋 Building'),
+    'breakfast': ('🍳 Breakfast', 30, 'Meal', '🔋🔋 Good'),
+    'break': ('☕ Break', 15, 'Break', '🔋 Recharge'),
+    'lunch': ('🍽️ Lunch', 45, 'Meal', '🔋🔋 Good'),
+    'dinner': ('🍝 Dinner', 45, 'Meal', '🔋🔋 Good'),
+    'sleep': ('😴 Sleep Preparation', 30, 'Personal', '🔋 Winding Down')
+}
+
+# Fixed blocks of a day: (DAILY_ROWS key, routine field, default time)
+DAILY_FIXED_BLOCKS = [
+    ('wake', 'wake_time', '07:00'),
+    ('breakfast', 'breakfast_time', '08:00'),
+    ('lunch', 'lunch_time', '13:00'),
+    ('dinner', 'dinner_time', '19:30'),
+    ('sleep', 'sleep_time', '22:30')
+]
+
+# Horizon planner: review offsets in days after a topic is first studied
+REVIEW_INTERVALS = (1, 3, 7, 14, 30)
+HORIZON_PHASES = ['Foundation', 'Development', 'Advanced', 'Revision']
+HORIZON_COLUMNS = ['Date', 'Day', 'Week', 'Phase', 'Subject', 'Session', 'Duration']
+HORIZON_MINUTES = {'learn': 120, 'review': 30, 'revision': 60}
+
+def _as_date(value):
+    """date from a date/datetime or ISO string; None if empty"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return datetime.strptime(value[:10], '%Y-%m-%d').date()
+    return value
+
+def clock_minutes(value) -> int:
+    """Minutes since midnight for an 'H:MM' / 'HH:MM' time string"""
+    hours, minutes = str(value).split(':')[:2]
+    return int(hours) * 60 + int(minutes)
+
+def duration_minutes(value) -> int:
+    """Minutes in a duration label such as '2 hours', '45 min' or '1.5 hours'"""
+    amount, _, unit = str(value).strip().partition(' ')
+    return int(round(float(amount) * (60 if unit.startswith('hour') else 1)))
+
+def duration_label(minutes: int) -> str:
+    """Inverse of duration_minutes: '2 hours', '1 hour' or '90 min'"""
+    if minutes % 60 == 0:
+        hours = minutes // 60
+        return f'{hours} hour' if hours == 1 else f'{hours} hours'
+    return f'{minutes} min'
+
+# Preferred study windows in minutes since midnight
+PREFERENCE_WINDOWS = {
+    'morning': (5 * 60, 12 * 60),
+    'afternoon': (12 * 60, 17 * 60),
+    'evening': (17 * 60, 24 * 60)
+}
+STUDY_MINUTES = 120
+BREAK_MINUTES = 15
+MIN_STUDY_MINUTES = 45
+
+class FreeIntervals:
+    """Sorted, non-overlapping free [start, end) intervals in minutes
+    
+    Kept as two parallel sorted lists so blocking a range is a bisect
+    plus a local splice.
+    """
+    
+    def __init__(self, start: int, end: int):
+        self.starts = [start] if end > start else []
+        self.ends = [end] if end > start else []
+    
+    def block(self, start: int, end: int):
+        """Remove [start, end) from the free time"""
+        if end <= start:
+            return
+        first = bisect.bisect_right(self.ends, start)
+        last = bisect.bisect_left(self.starts, end)
+        if first >= last:
+            return
+        keep_starts, keep_ends = [], []
+        if self.starts[first] < start:
+            keep_starts.append(self.starts[first])
+            keep_ends.append(start)
+        if self.ends[last - 1] > end:
+            keep_starts.append(end)
+            keep_ends.append(self.ends[last - 1])
+        self.starts[first:last] = keep_starts
+        self.ends[first:last] = keep_ends
+    
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+    
+    def __len__(self):
+        return len(self.starts)
+
+class TimeSlotAllocator:
+    """Pack study sessions into the free time of a day
+    
+    Wake-up, meals, sleep and any fixed sessions are blocked intervals.
+    Every free gap is packed with session + break units anchored at the
+    start of the preferred window, and the best-scoring units (most
+    overlap with the preferred window, then closest to it, then earliest)
+    are chosen. Sorting the blocks and candidates keeps this O(n log n).
+    """
+    
+    def __init__(self, day_start: int, day_end: int, preference: str = None):
+        self.free = FreeIntervals(day_start, day_end)
+        self.window = PREFERENCE_WINDOWS.get(preference)
+    
+    def block(self, start: int, duration: int):
+        self.free.block(start, start + duration)
+    
+    def allocate(self, count: int, duration: int = STUDY_MINUTES,
+                 break_minutes: int = BREAK_MINUTES) -> List[Tuple[int, int]]:
+        """Choose ``count`` (start, length) study slots, best slot first
+        
+        Sessions are shortened in 15 minute steps (down to
+        MIN_STUDY_MINUTES) when the day cannot fit them at full length.
+        Fewer than ``count`` slots are returned when even the shortest
+        sessions do not fit; callers report what was left out.
+        """
+        if count <= 0:
+            return []
+        candidates = []
+        length = duration
+        while length >= min(MIN_STUDY_MINUTES, duration):
+            candidates = [slot for gap in self.free for slot in self._pack(gap, length + break_minutes)]
+            if len(candidates) >= count:
+                break
+            length -= 15
+        if not candidates:
+            return []
+        
+        chosen = heapq.nsmallest(count, candidates, key=self._rank)
+        return [(start, unit - break_minutes) for start, unit in chosen]
+    
+    def _pack(self, gap: Tuple[int, int], unit: int) -> List[Tuple[int, int]]:
+        """Session + break units that fit in one gap, aligned to the preferred window"""
+        start, end = gap
+        anchor = start
+        if self.window:
+            anchor = min(max(self.window[0], start), end)
+        slots = [(slot, unit) for slot in range(anchor, end - unit + 1, unit)]
+        slots += [(slot, unit) for slot in range(anchor - unit, start - 1, -unit)]
+        return slots
+    
+    def _rank(self, slot: Tuple[int, int]):
+        start, unit = slot
+        if not self.window:
+            return (0, 0, start)
+        window_start, window_end = self.window
+        # Windows are clock times; allocation may run past midnight
+        clock_start = start % MINUTES_PER_DAY
+        overlap = max(0, min(clock_start + unit, window_end) - max(clock_start, window_start))
+        distance = max(window_start - (clock_start + unit), clock_start - window_end, 0)
+        return (-overlap, distance, start)
+
+class ScheduleGenerator:
+    """Generate customized study schedules"""
+    
+    @staticmethod
+    def create_schedule(data: Dict) -> pd.DataFrame:
+        """Create schedule based on user data, as display strings
+        
+        Same frame as display_plan(create_plan(data)), but daily, weekly and
+        monthly plans are built as strings directly, without the compact
+        round trip.
+        """
+        plan_type = data.get('plan_type', 'daily')
+        
+        if plan_type == 'horizon':
+            return display_plan(ScheduleGenerator._horizon_schedule(data))
+        elif plan_type == 'daily':
+            return ScheduleGenerator._daily_display(*ScheduleGenerator._daily_rows(data))
+        elif plan_type == 'weekly':
+            return ScheduleGenerator._weekly_schedule(data)
+        else:
+            return ScheduleGenerator._monthly_schedule(data)
+    
+    @staticmethod
+    def create_plan(data: Dict) -> pd.DataFrame:
+        """Create the compact, typed plan (see compact_plan) for user data
+        
+        Only the 'horizon' plan type is planned up to ``exam_date``; other
+        types keep their own layout (an exam date still bounds their
+        calendar export).
+        """
+        plan_type = data.get('plan_type', 'daily')
+        
+        if plan_type == 'horizon':
+            return ScheduleGenerator._horizon_schedule(data)
+        elif plan_type == 'daily':
+            return ScheduleGenerator._daily_schedule(data)
+        elif plan_type == 'weekly':
+            return compact_plan(ScheduleGenerator._weekly_schedule(data))
+        else:
+            return compact_plan(ScheduleGenerator._monthly_schedule(data))
+    
+    @staticmethod
+    def _daily_schedule(data: Dict) -> pd.DataFrame:
+        """Generate daily schedule
+        
+        Study sessions without a fixed start time are placed by
+        TimeSlotAllocator around wake-up, meals and sleep, following the
+        routine's study preference; subjects the day has no room for are
+        listed in the plan's ``attrs['unplaced']``. Rows are collected as
+        parallel columns with times in minutes since midnight and ordered
+        with one stable argsort. The result is a compact plan; HH:MM and
+        duration labels are only produced by display_plan.
+        """
+        return ScheduleGenerator._daily_plan(*ScheduleGenerator._daily_rows(data))
+    
+    @staticmethod
+    def _daily_rows(data: Dict) -> Tuple[List[int], List[Tuple], List[str]]:
+        """Start minutes and (Activity, minutes, Type, Energy) rows of a daily plan, unsorted
+        
+        The third item lists the subjects that did not fit into the day.
+        """
+        routine = data.get('routine', {})
+        subjects = data.get('subjects', ['Math', 'Science', 'English'])
+        
+        minutes = []
+        rows = []
+        
+        def add(start, row):
+            minutes.append(start)
+            rows.append(row)
+        
+        allocator, on_day, fixed = ScheduleGenerator._day_layout(routine)
+        for key, start in fixed.items():
+            add(start, DAILY_ROWS[key])
+        
+        # Study sessions: fixed ones as given, the rest packed into free time
+        study_sessions = routine.get('study_sessions', [])
+        if study_sessions:
+            sessions = [(f'Subject {i+1}' if not subjects else subjects[i % len(subjects)], session)
+                        for i, session in enumerate(study_sessions)]
+        else:
+            sessions = [(subject, {}) for subject in subjects]
+        
+        floating = []
+        unplaced = []
+        for subject, session in sessions:
+            length = duration_minutes(session['duration']) if session.get('duration') else STUDY_MINUTES
+            if session.get('start_time'):
+                start = on_day(clock_minutes(session['start_time']))
+                allocator.block(start, length + BREAK_MINUTES)
+                break_start = on_day(clock_minutes(session['break_time'])) if session.get('break_time') else None
+                ScheduleGenerator._add_session(add, subject, start, length, break_start)
+            else:
+                floating.append((subject, length))
+        
+        if floating:
+            # Best slots go to subjects in the order the student listed them
+            slots = allocator.allocate(len(floating), max(length for _, length in floating))
+            for (subject, _), (start, length) in zip(floating, slots):
+                ScheduleGenerator._add_session(add, subject, start, length)
+            unplaced = [subject for subject, _ in floating[len(slots):]]
+        
+        return minutes, rows, unplaced
+    
+    @staticmethod
+    def _day_layout(routine: Dict):
+        """Allocator for a routine's waking day with its fixed blocks taken
+        
+        Returns the allocator, a function mapping clock minutes onto the
+        waking day (which may run past midnight) and the start of each
+        fixed block keyed by its DAILY_ROWS key.
+        """
+        wake = clock_minutes(routine.get('wake_time', '07:00'))
+        sleep = clock_minutes(routine.get('sleep_time', '22:30'))
+        if sleep <= wake:
+            sleep += MINUTES_PER_DAY
+        allocator = TimeSlotAllocator(wake, sleep, routine.get('study_preference'))
+        
+        def on_day(start):
+            return start + MINUTES_PER_DAY if start < wake else start
+        
+        # Wake-up, meals and sleep are fixed blocks
+        fixed = {}
+        for key, field, default in DAILY_FIXED_BLOCKS:
+            fixed[key] = on_day(clock_minutes(routine.get(field, default)))
+            allocator.block(fixed[key], DAILY_ROWS[key][1])
+        return allocator, on_day, fixed
+    
+    @staticmethod
+    def _daily_plan(minutes: List[int], rows: List[Tuple], unplaced: List[str] = ()) -> pd.DataFrame:
+        """Compact daily plan from row start minutes and (Activity, minutes, Type, Energy) rows"""
+        minutes = np.array(minutes, dtype=np.int16)
+        # Sort by time of day once; the index keeps each row's insertion position
+        order = np.argsort(minutes, kind='stable')
+        columns = list(zip(*rows)) or [[]] * 4
+        activity = categorical(np.array(columns[0], dtype=object)[order])
+        plan = pd.DataFrame({
+            'Start': minutes[order],
+            'Activity': activity,
+            'Minutes': np.array(columns[1], dtype=np.int16)[order],
+            'Type': categorical(np.array(columns[2], dtype=object)[order], SESSION_TYPES),
+            'Energy Level': categorical(np.array(columns[3], dtype=object)[order], ENERGY_LEVELS),
+            'Subject': study_subjects(activity)
+        }, index=order)
+        plan.attrs['unplaced'] = list(unplaced)
+        return plan
+    
+    @staticmethod
+    def _daily_display(minutes: List[int], rows: List[Tuple], unplaced: List[str] = ()) -> pd.DataFrame:
+        """Daily plan as display strings, straight from the collected rows"""
+        minutes = np.array(minutes, dtype=np.int32)
+        # Sort by time of day once; the index keeps each row's insertion position
+        order = np.argsort(minutes, kind='stable')
+        columns = list(zip(*rows)) or [[]] * 4
+        labels = {length: duration_label(length) for length in set(columns[1])}
+        schedule = pd.DataFrame({
+            'Time': CLOCK_LABELS[minutes[order] % MINUTES_PER_DAY],
+            'Activity': np.array(columns[0], dtype=object)[order],
+            'Duration': np.array([labels[length] for length in columns[1]], dtype=object)[order],
+            'Type': np.array(columns[2], dtype=object)[order],
+            'Energy Level': np.array(columns[3], dtype=object)[order]
+        }, index=order)
+        schedule.attrs['unplaced'] = list(unplaced)
+        return schedule
+    
+    @staticmethod
+    def _add_session(add, subject: str, start: int, length: int, break_start: int = None):
+        """Add a study session row and the break that follows it"""
+        add(start, (f'{STUDY_PREFIX}{subject}', length, 'Study', '🔋🔋🔋 Peak'))
+        add(start + length if break_start is None else break_start, DAILY_ROWS['break'])
+    
+    @staticmethod
+    def _weekly_schedule(data: Dict) -> pd.DataFrame:
+        """Generate weekly schedule
+        
+        A fixed seven-day overview; day-level plans up to an exam come from
+        _horizon_schedule (plan type 'horizon').
+        """
+        subjects = data.get('subjects', ['Math', 'Science', 'English'])
+        
+        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+        schedule = []
+        
+        for i, day in enumerate(days):
+            if day == 'Sunday':
+                schedule.append({
+                    'Day': day,
+                    'Morning (7-12)': '🌅 Rest/Light Review',
+                    'Afternoon (12-5)': '📝 Weekly Planning',
+                    'Evening (5-10)': '🎯 Goal Setting',
+                    'Focus Subject': 'Review Week',
+                    'Special Notes': '✨ Recharge Day'
+                })
+            else:
+                subject_index = i % len(subjects)
+                schedule.append({
+                    'Day': day,
+                    'Morning (7-12)': f'📚 {subjects[subject_index]}',
+                    'Afternoon (12-5)': f'✍️ Practice {subjects[(subject_index + 1) % len(subjects)]}',
+                    'Evening (5-10)': '📖 Review & Homework',
+                    'Focus Subject': subjects[subject_index],
+                    'Special Notes': '💪 Stay Focused!'
+                })
+        
+        return pd.DataFrame(schedule)
+    
+    @staticmethod
+    def _monthly_schedule(data: Dict) -> pd.DataFrame:
+        """Generate monthly schedule
+        
+        A fixed four-week overview; day-level plans up to an exam come from
+        _horizon_schedule (plan type 'horizon').
+        """
+        subjects = data.get('subjects', ['Math', 'Science', 'English'])
+        
+        weeks = ['Week 1', 'Week 2', 'Week 3', 'Week 4']
+        schedule = []
+        
+        for i, week in enumerate(weeks):
+            schedule.append({
+                'Week': week,
+                'Phase': ['Foundation', 'Development', 'Advanced', 'Revision'][i],
+                'Focus Areas': ', '.join(subjects),
+                'Target': f'{(i+1)*25}% Complete',
+                'Milestones': ['Basics Clear', 'Practice Started', 'Mock Tests', 'Final Review'][i],
+                'Motivation': ['🚀 Strong Start!', '💪 Keep Going!', '🎯 Almost There!', '🏆 Final Push!'][i]
+            })
+        
+        return pd.DataFrame(schedule)
+
+    @staticmethod
+    def _horizon_schedule(data: Dict) -> pd.DataFrame:
+        """Generate day-level sessions over several weeks with spaced repetition
+        
+        The horizon runs from ``start_date`` (default today) up to
+        ``exam_date``, or for ``horizon_weeks`` weeks (default 4). Each new
+        topic session schedules reviews REVIEW_INTERVALS days later. A
+        priority queue hands out each day's study time (``sessions_per_day``
+        two-hour blocks): due reviews first (most overdue first), then new
+        material for the subject studied least so far. The last quarter is
+        revision only. Returns a compact plan.
+        """
+        subjects = data.get('subjects', ['Math', 'Science', 'English'])
+        start = _as_date(data.get('start_date')) or datetime.now().date()
+        exam = _as_date(data.get('exam_date'))
+        total_days = (exam - start).days if exam else 7 * int(data.get('horizon_weeks', 4))
+        per_day = int(data.get('sessions_per_day', 3))
+        
+        columns = {name: [] for name in HORIZON_COLUMNS}
+        reviews = []  # (due day, sequence, subject, review step)
+        rotation = [(0, position, subject) for position, subject in enumerate(subjects)]
+        sequence = itertools.count()
+        
+        for day in range(max(total_days, 0)):
+            date = start + timedelta(days=day)
+            phase = HORIZON_PHASES[min(4 * day // total_days, 3)]
+            # Sundays stay light, as in the weekly planner
+            budget = STUDY_MINUTES * (1 if date.weekday() == 6 else per_day)
+            today = []
+            
+            while reviews and reviews[0][0] <= day and budget >= HORIZON_MINUTES['review']:
+                due, _, subject, step = heapq.heappop(reviews)
+                today.append((subject, f'🔁 Review {step + 1}/{len(REVIEW_INTERVALS)}', 'review'))
+                budget -= HORIZON_MINUTES['review']
+                if step + 1 < len(REVIEW_INTERVALS):
+                    # Late reviews push the rest of the chain back by the same amount
+                    gap = REVIEW_INTERVALS[step + 1] - REVIEW_INTERVALS[step]
+                    heapq.heappush(reviews, (day + gap, next(sequence), subject, step + 1))
+            
+            skipped = []
+            kind = 'revision' if phase == 'Revision' else 'learn'
+            while rotation and budget >= HORIZON_MINUTES[kind]:
+                count, position, subject = heapq.heappop(rotation)
+                if any(entry[0] == subject and entry[2] == kind for entry in today):
+                    skipped.append((count, position, subject))
+                    continue
+                if kind == 'revision':
+                    today.append((subject, '🎯 Revision', kind))
+                else:
+                    today.append((subject, '📚 New Material', kind))
+                    heapq.heappush(reviews, (day + REVIEW_INTERVALS[0], next(sequence), subject, 0))
+                heapq.heappush(rotation, (count + 1, position, subject))
+                budget -= HORIZON_MINUTES[kind]
+            for entry in skipped:
+                heapq.heappush(rotation, entry)
+            
+            day_name, week = WEEKDAYS[date.weekday()], f'Week {day // 7 + 1}'
+            for subject, session, kind in today:
+                columns['Date'].append(date)
+                columns['Day'].append(day_name)
+                columns['Week'].append(week)
+                columns['Phase'].append(phase)
+                columns['Subject'].append(subject)
+                columns['Session'].append(session)
+                columns['Duration'].append(HORIZON_MINUTES[kind])
+        
+        return pd.DataFrame({
+            'Date': np.array(columns['Date'], dtype='datetime64[D]').astype('datetime64[s]'),
+            'Day': categorical(columns['Day'], WEEKDAYS),
+            'Week': categorical(columns['Week']),
+            'Phase': categorical(columns['Phase'], PLAN_ENUMS['Phase']),
+            'Subject': categorical(columns['Subject']),
+            'Session': categorical(columns['Session']),
+            'Minutes': np.array(columns['Duration'], dtype=np.int16)
+        })
+
+# ==================== SCHEDULE MODEL ====================
+# Plans are stored typed: times and durations as int16 minutes, repeated
+# labels as categoricals whose codes start with these fixed values.
+SESSION_TYPES = ('Personal', 'Meal', 'Break', 'Study')
+ENERGY_LEVELS = ('🔋 Building', '🔋🔋 Good', '🔋 Recharge', '🔋 Winding Down', '🔋🔋🔋 Peak')
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+PLAN_ENUMS = {'Type': SESSION_TYPES, 'Energy Level': ENERGY_LEVELS, 'Phase': tuple(HORIZON_PHASES), 'Day': WEEKDAYS}
+STUDY_PREFIX = '📚 Study: '
+
+@st.cache_resource(show_spinner=False)
+def get_plan_dtypes() -> LRUCache:
+    return LRUCache(1024)
+
+def plan_dtype(categories: Tuple) -> pd.CategoricalDtype:
+    """Shared categorical dtype for a category tuple, so plans reuse one category index"""
+    dtypes = get_plan_dtypes()
+    dtype = dtypes.get(categories)
+    if dtype is None:
+        dtype = pd.CategoricalDtype(pd.Index(list(categories), dtype=object))
+        dtypes.set(categories, dtype)
+    return dtype
+
+def categorical(values, categories: Tuple = ()) -> pd.Categorical:
+    """Categorical of ``values`` whose first codes are the fixed ``categories``
+    
+    Other values follow in order of first appearance; missing values get
+    code -1.
+    """
+    lookup = {value: code for code, value in enumerate(categories)}
+    codes = np.array([-1 if value is None or value != value else lookup.setdefault(value, len(lookup))
+                      for value in values], dtype=np.int32)
+    return pd.Categorical.from_codes(codes, dtype=plan_dtype(tuple(lookup)), validate=False)
+
+def label_minutes(values, parse) -> np.ndarray:
+    """int16 minutes for time or duration labels, parsing each distinct label once"""
+    codes, labels = pd.factorize(values)
+    return np.array([parse(label) for label in labels], dtype=np.int16)[codes]
+
+def plan_minutes(times) -> np.ndarray:
+    """Minutes since the start of the plan day for daily 'HH:MM' rows
+    
+    Rows are in day order, so a clock that goes backwards has passed
+    midnight and later rows get 1440 added.
+    """
+    minutes = label_minutes(times, clock_minutes)
+    days = np.concatenate([[0], np.cumsum(np.diff(minutes) < 0)]).astype(np.int16)
+    return minutes + days * np.int16(MINUTES_PER_DAY)
+
+def study_subjects(activity: pd.Categorical) -> pd.Categorical:
+    """Subject of each study row (missing elsewhere), worked out per category"""
+    names = [str(value)[len(STUDY_PREFIX):] if str(value).startswith(STUDY_PREFIX) else None
+             for value in activity.categories]
+    subjects = {name: code for code, name in enumerate(dict.fromkeys(name for name in names if name is not None))}
+    # The trailing -1 maps missing activities (code -1) to a missing subject
+    lookup = np.array([subjects.get(name, -1) for name in names] + [-1], dtype=np.int32)
+    return pd.Categorical.from_codes(lookup[activity.codes], dtype=plan_dtype(tuple(subjects)), validate=False)
+
+def compact_plan(df: pd.DataFrame) -> pd.DataFrame:
+    """Typed, compact form of a display frame; display_plan is the inverse
+    
+    'Time' becomes 'Start' (int16 minutes from the start of the plan day),
+    'Duration' becomes 'Minutes' (int16), 'Date' a datetime column and
+    every other column a categorical. Plans with an 'Activity' column also
+    get a categorical 'Subject' for their study rows.
+    """
+    columns = {}
+    for name in df.columns:
+        if name == 'Time':
+            columns['Start'] = plan_minutes(df[name])
+        elif name == 'Duration':
+            columns['Minutes'] = label_minutes(df[name], duration_minutes)
+        elif name == 'Date':
+            codes, dates = pd.factorize(df[name])
+            columns['Date'] = pd.to_datetime(dates, format='%Y-%m-%d').to_numpy()[codes]
+        else:
+            columns[name] = categorical(df[name], PLAN_ENUMS.get(name, ()))
+    if 'Activity' in columns and 'Subject' not in columns:
+        columns['Subject'] = study_subjects(columns['Activity'])
+    return pd.DataFrame(columns, index=df.index)
+
+def display_plan(plan: pd.DataFrame) -> pd.DataFrame:
+    """Display strings of a compact plan, as shown, styled and exported"""
+    columns = {}
+    for name in plan.columns:
+        values = plan[name]
+        if name == 'Start':
+            columns['Time'] = CLOCK_LABELS[values.to_numpy() % MINUTES_PER_DAY]
+        elif name == 'Minutes':
+            codes, minutes = pd.factorize(values)
+            columns['Duration'] = np.array([duration_label(int(m)) for m in minutes], dtype=object)[codes]
+        elif name == 'Date':
+            codes, dates = pd.factorize(values)
+            columns['Date'] = np.array(dates.strftime('%Y-%m-%d'), dtype=object)[codes]
+        elif name == 'Subject' and 'Activity' in plan.columns:
+            continue
+        else:
+            columns[name] = values.to_numpy(dtype=object)
+    return pd.DataFrame(columns, index=plan.index)
+
+# ==================== BATCH GENERATION ====================
+def _student_id(data: Dict, position: int) -> str:
+    """Roster identifier for one project_data dict"""
+    return str(data.get('student_id') or data.get('folder_name') or f'student_{position + 1}')
+
+def _schedule_chunk(chunk: List[Tuple[str, Dict]]) -> List[Tuple[str, pd.DataFrame]]:
+    """Worker task: generate the plans of one roster chunk"""
+    return [(student, ScheduleGenerator.create_schedule(data)) for student, data in chunk]
+
+def iter_schedules(batch: Iterable[Dict], processes: int = None,
+                   chunksize: int = 64) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """Generate plans for a roster, yielding (student, frame) in input order
+    
+    Work is spread over a process pool in chunks of ``chunksize`` students.
+    At most two chunks per worker are in flight, so memory stays bounded
+    no matter how long the roster is. ``processes=1`` runs in-process.
+    """
+    processes = processes or os.cpu_count() or 1
+    chunks = _roster_chunks(batch, chunksize)
+    
+    if processes == 1:
+        for chunk in chunks:
+            yield from _schedule_chunk(chunk)
+        return
+    
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_schedule_chunk, chunk))
+            if len(pending) >= 2 * processes:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+def _roster_chunks(batch: Iterable[Dict], chunksize: int) -> Iterator[List[Tuple[str, Dict]]]:
+    """Split a roster into lists of (student, project_data)"""
+    chunk = []
+    for position, data in enumerate(batch):
+        chunk.append((_student_id(data, position), data))
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def create_schedules(batch: Iterable[Dict], processes: int = None, chunksize: int = 64) -> pd.DataFrame:
+    """Generate plans for a whole roster as one long-format DataFrame
+    
+    Each input is a project_data dict as built by the wizard, optionally
+    with a 'student_id'. The result has a leading 'Student' column; plans
+    of different types contribute their own columns. Use iter_schedules to
+    stream per-student frames instead.
+    """
+    frames = []
+    for student, frame in iter_schedules(batch, processes, chunksize):
+        frames.append(frame.assign(Student=student))
+    if not frames:
+        return pd.DataFrame(columns=['Student'])
+    
+    result = pd.concat(frames, ignore_index=True)
+    return result[['Student'] + [col for col in result.columns if col != 'Student']]
+
+# ==================== PLAN CACHE ====================
+PLAN_PRESENTATION_FIELDS = ('generated_plan', 'folder_name', 'problem', 'template')
+# 'created' is not a project field: it stands for today's date, which these exports print
+RENDER_FIELDS = {
+    'pdf': ('template', 'plan_type', 'folder_name', 'created'),
+    'excel': ('template', 'plan_type', 'folder_name', 'created'),
+    'docx': ('template', 'plan_type', 'folder_name', 'created'),
+    'png': ('template', 'plan_type', 'folder_name'),
+    'ics': ('template', 'folder_name', 'student_id', 'start_date', 'exam_date'),
+    'parquet': ('plan_type', 'folder_name', 'student_id'),
+    'csv': ('template',)
+}
+# A bundle holds every selected format, so it reads all of their fields
+RENDER_FIELDS['bundle'] = tuple(sorted(set().union(*RENDER_FIELDS.values()))) + ('formats',)
+
+def plan_cache_key(data: Dict, exclude: Iterable[str] = ('generated_plan',)) -> str:
+    """Canonical hash of project_data: key order and whitespace never matter"""
+    payload = {k: v for k, v in data.items() if k not in exclude}
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def plan_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a plan frame, including column names and index
+    
+    Plan keys are taken from display frames (create_schedule /
+    display_plan output) everywhere, never from compact plans.
+    """
+    digest = hashlib.sha256(json.dumps(list(map(str, df.columns))).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return digest.hexdigest()
+
+def payload_bytes(value) -> int:
+    """Memory held by a cached plan frame or export"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    return len(value)
+
+class PlanCache:
+    """Process-wide LRU cache of generated plans and their exports
+    
+    Schedules are keyed on the planning inputs only (project name, problem
+    statement and template never change the rows), so identical inputs
+    from different students share one result. Export bytes are keyed on
+    the plan's content plus the few fields the exporter reads, which keeps
+    edited plans correct too; zip bundles also on the formats they hold. Both include the effective
+    start date (today when unset), so dated plans do not outlive their day,
+    and exports that print a "Created" date are keyed on today's date.
+    
+    The cache is bounded on payload size (``max_bytes``, default 256 MiB):
+    frames count their deep memory usage, exports their length.
+    """
+    
+    def __init__(self, max_bytes: int = 256 * 2**20):
+        self.entries = LRUCache(None, max_bytes, payload_bytes)
+    
+    @classmethod
+    def from_env(cls) -> 'PlanCache':
+        return cls(int(os.getenv('PLANIFY_PLAN_CACHE_BYTES', str(256 * 2**20))))
+    
+    def _fetch(self, key, build):
+        value = self.entries.get(key)
+        if value is None:
+            value = build()
+            if value is not None:
+                self.entries.set(key, value)
+        return value
+    
+    def schedule(self, data: Dict, build) -> pd.DataFrame:
+        """Return the cached schedule for these inputs, building it on a miss"""
+        return self._fetch(self._schedule_key(data), build)
+    
+    def has_schedule(self, data: Dict) -> bool:
+        return self._schedule_key(data) in self.entries
+    
+    def lookup(self, artifact: str, plan_key: str, data: Dict) -> Optional[bytes]:
+        """Cached export bytes of the plan fingerprinted ``plan_key``, if any"""
+        return self.entries.get(self._render_key(artifact, plan_key, data))
+    
+    def store(self, artifact: str, plan_key: str, data: Dict, value: Optional[bytes]):
+        if value is not None:
+            self.entries.set(self._render_key(artifact, plan_key, data), value)
+    
+    @staticmethod
+    def _schedule_key(data: Dict) -> Tuple[str, str]:
+        return ('schedule', plan_cache_key(PlanCache._with_start_date(data), PLAN_PRESENTATION_FIELDS))
+    
+    @staticmethod
+    def _render_key(artifact: str, plan_key: str, data: Dict) -> Tuple[str, str, str]:
+        fields = {name: data.get(name) for name in RENDER_FIELDS[artifact]}
+        if 'start_date' in fields:
+            fields = PlanCache._with_start_date(fields)
+        if 'created' in fields:
+            fields['created'] = datetime.now().date().isoformat()
+        return (artifact, plan_key, plan_cache_key(fields))
+    
+    @staticmethod
+    def _with_start_date(data: Dict) -> Dict:
+        """``data`` with start_date resolved the way the planners resolve it"""
+        start = _as_date(data.get('start_date')) or datetime.now().date()
+        return {**data, 'start_date': start.isoformat()}
+    
+    @property
+    def stats(self) -> Dict:
+        return self.entries.stats
+
+@st.cache_resource(show_spinner=False)
+def get_plan_cache() -> PlanCache:
+    return PlanCache.from_env()
+
+# ==================== TEMPLATE STYLER ====================
+AESTHETIC_SKIP_COLUMNS = ('Time', 'Day', 'Week')
+EMOJI_DECORATIONS = np.array([' ✨', ' 🌟', ' 💫', ' ⭐', ' 🌈'], dtype=object)
+MINIMAL_STRIP_PATTERN = re.compile(r'[^\w\s:]')
+
+@st.cache_resource(show_spinner=False)
+def get_minimal_cell_cache() -> LRUCache:
+    return LRUCache(4096)
+
+class TemplateStyler:
+    """Apply different visual styles to schedules"""
+    
+    @staticmethod
+    def spec(template: str, plan_key: Optional[str] = None) -> 'StyleSpec':
+        """Lazy style for ``template``, applied when the plan is rendered"""
+        return StyleSpec(template, plan_key)
+    
+    @staticmethod
+    def apply_style(df: pd.DataFrame, template: str, plan_key: Optional[str] = None) -> pd.DataFrame:
+        """Apply template styling
+        
+        ``plan_key`` is the plan's fingerprint when the caller already has
+        it; otherwise it is computed for templates that need it.
+        """
+        return StyleSpec(template, plan_key).apply(df)
+    
+    @staticmethod
+    def _aesthetic_style(df: pd.DataFrame, plan_key: Optional[str] = None) -> pd.DataFrame:
+        """Apply aesthetic styling with emojis and colors"""
+        return StyleSpec('aesthetic', plan_key).apply(df)
+    
+    @staticmethod
+    def _minimal_style(df: pd.DataFrame) -> pd.DataFrame:
+        """Apply minimal clean styling"""
+        return StyleSpec('minimal').apply(df)
+    
+    @staticmethod
+    def _aesthetic_columns(df: pd.DataFrame, plan_key: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """Decorated values of the columns the aesthetic template changes
+        
+        About 30% of cells outside Time/Day/Week get a decorative emoji. The
+        mask and emoji picks come from a generator seeded with the plan's
+        content hash, so identical plans always render identically.
+        """
+        columns = [col for col in df.columns if col not in AESTHETIC_SKIP_COLUMNS]
+        if df.empty or not columns:
+            return {}
+        
+        rng = np.random.default_rng(int((plan_key or plan_fingerprint(df))[:16], 16))
+        mask = rng.random((len(df), len(columns))) > 0.7
+        picks = rng.integers(len(EMOJI_DECORATIONS), size=mask.shape)
+        
+        decorated = {}
+        for j, col in enumerate(columns):
+            rows = np.flatnonzero(mask[:, j])
+            if not len(rows):
+                continue
+            values = df[col].to_numpy(dtype=object, copy=True)
+            values[rows] = values[rows].astype(str).astype(object) + EMOJI_DECORATIONS[picks[rows, j]]
+            decorated[col] = values
+        
+        return decorated
+    
+    @staticmethod
+    def _minimal_columns(df: pd.DataFrame) -> Dict[str, pd.api.extensions.ExtensionArray]:
+        """Stripped values of the text columns
+        
+        Emojis and symbols are stripped from text columns only. All text
+        cells are factorized together so each distinct value is cleaned
+        once (and remembered across calls), then scattered back in place.
+        """
+        columns = list(df.select_dtypes(include=['object', 'string']).columns)
+        if df.empty or not columns:
+            return {}
+        
+        # Remove emojis for minimal look
+        cells = np.concatenate([df[col].to_numpy(dtype=object) for col in columns])
+        codes, uniques = pd.factorize(cells)
+        cache = get_minimal_cell_cache()
+        stripped = np.empty(len(uniques) + 1, dtype=object)
+        stripped[-1] = np.nan
+        for i, value in enumerate(uniques):
+            stripped[i] = cache.get(value)
+            if stripped[i] is None:
+                stripped[i] = MINIMAL_STRIP_PATTERN.sub('', str(value))
+                cache.set(value, stripped[i])
+        
+        return {col: pd.array(values, dtype=df[col].dtype)
+                for col, values in zip(columns, stripped[codes].reshape(len(columns), len(df)))}
+
+class StyleSpec:
+    """How a template decorates a plan, applied only at render time
+    
+    The session keeps one canonical plan frame; the UI table and every
+    exporter render it through a spec, so one plan can be exported in any
+    template and styled strings are never stored.
+    """
+    
+    def __init__(self, template: str = 'simple', plan_key: Optional[str] = None):
+        self.template = template or 'simple'
+        self.plan_key = plan_key
+    
+    def columns(self, df: pd.DataFrame) -> Dict:
+        """Display values of the columns this template changes"""
+        if self.template == 'aesthetic':
+            return TemplateStyler._aesthetic_columns(df, self.plan_key)
+        elif self.template == 'minimal':
+            return TemplateStyler._minimal_columns(df)
+        else:
+            return {}  # Simple style - no modifications
+    
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Rendered view of ``df``; untouched columns share its data"""
+        changed = self.columns(df)
+        if not changed:
+            return df
+        view = df.copy(deep=False)
+        for col, values in changed.items():
+            view[col] = values
+        return view
+
+# ==================== EXPORT MANAGER ====================
+PDF_FONT_PATH = os.getenv('PLANIFY_PDF_FONT')
+EXCEL_CHUNK_ROWS = 4096
+EXPORT_WORKERS = int(os.getenv('PLANIFY_EXPORT_WORKERS', '4'))
+XML_ILLEGAL_PATTERN = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# Word table looks, matching the Excel palettes
+DOCX_TEMPLATES = {
+    'aesthetic': {'header_fill': 'FF6B9D', 'header_color': 'FFFFFF', 'fills': ('FFE0EC', 'FFF0F5'), 'center': True},
+    'minimal': {'header_fill': 'F5F5F5', 'header_color': None, 'fills': (None,), 'center': True},
+    'simple': {'header_fill': None, 'header_color': None, 'fills': (None,), 'center': False}
+}
+
+# Shareable image (phone wallpaper) settings
+PNG_SIZE = (1080, 1920)
+PNG_FONT_PATH = os.getenv('PLANIFY_PNG_FONT')
+PNG_FONT_SIZES = (30, 26, 22, 18)
+PNG_BAND_ROWS = 64
+PNG_UNSUPPORTED_PATTERN = re.compile('[\U00010000-\U0010FFFF\uFE0F\u200D]')
+PNG_TEMPLATES = {
+    'aesthetic': {'gradient': ((102, 126, 234), (118, 75, 162)), 'text': (255, 255, 255),
+                  'header': (255, 107, 157), 'header_text': (255, 255, 255), 'band': None, 'rule': (196, 178, 240)},
+    'minimal': {'gradient': ((255, 255, 255), (255, 255, 255)), 'text': (45, 45, 45),
+                'header': (245, 245, 245), 'header_text': (45, 45, 45), 'band': None, 'rule': (228, 228, 228)},
+    'simple': {'gradient': ((248, 249, 252), (248, 249, 252)), 'text': (30, 30, 30),
+               'header': (108, 99, 255), 'header_text': (255, 255, 255), 'band': (236, 238, 248), 'rule': None}
+}
+
+# Calendar export: recurring plans repeat until the exam date or for a semester
+ICS_SEMESTER_WEEKS = int(os.getenv('PLANIFY_ICS_WEEKS', '16'))
+SLOT_HOURS_PATTERN = re.compile(r'\((\d{1,2})-(\d{1,2})\)')
+ICS_WEEKDAYS = {'Monday': 'MO', 'Tuesday': 'TU', 'Wednesday': 'WE', 'Thursday': 'TH',
+                'Friday': 'FR', 'Saturday': 'SA', 'Sunday': 'SU'}
+ICS_ESCAPES = str.maketrans({'\\': '\\\\', ';': '\\;', ',': '\\,', '\n': '\\n', '\r': None})
+ICS_LINE_OCTETS = 75
+
+# Columnar export: enums keep their PLAN_ENUMS codes; pyarrow is imported on first use
+PARQUET_ROW_GROUP_ROWS = 65536
+
+# Formats whose payload is already compressed go into bundles as-is
+ZIP_STORED_FORMATS = ('excel', 'docx', 'png', 'pdf', 'parquet')
+
+# Download order in the UI: fastest formats first
+EXPORT_FORMATS = {
+    'csv': {'label': "📋 Download CSV", 'extension': 'csv', 'mime': "text/csv"},
+    'ics': {'label': "📅 Add to Calendar", 'extension': 'ics', 'mime': "text/calendar"},
+    'excel': {'label': "📊 Download Excel", 'extension': 'xlsx',
+              'mime': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+    'docx': {'label': "📝 Download Word", 'extension': 'docx',
+             'mime': "application/vnd.openxmlformats-officedocument.wordprocessingml.document"},
+    'png': {'label': "🖼️ Download Wallpaper", 'extension': 'png', 'mime': "image/png"},
+    'pdf': {'label': "📄 Download PDF", 'extension': 'pdf', 'mime': "application/pdf"},
+    'parquet': {'label': "🧮 Download Parquet", 'extension': 'parquet', 'mime': "application/vnd.apache.parquet"}
+}
+
+class ExportManager:
+    """Handle all export operations"""
+    
+    @staticmethod
+    def export(fmt: str, df: pd.DataFrame, data: Dict, style: Optional[StyleSpec] = None) -> bytes:
+        """Run the exporter for one EXPORT_FORMATS key
+        
+        Exporters raise on failure rather than calling st.error: they run on
+        pool workers, where Streamlit output is dropped, so the script
+        thread reports the error.
+        """
+        if fmt == 'csv':
+            return ExportManager.to_csv(df, style)
+        return getattr(ExportManager, f'to_{fmt}')(df, data, style)
+    
+    @staticmethod
+    def to_pdf(df: pd.DataFrame, data: Dict, style: Optional[StyleSpec] = None,
+               sink: Optional[BinaryIO] = None) -> Union[bytes, BinaryIO]:
+        """Export to PDF, styled with ``style`` (default: the project's template)
+        
+        Rows are read from column arrays, long cells wrap instead of being
+        truncated, and the table header repeats on every page. Wrapped lines
+        are cached per distinct cell value. With ``sink`` (a binary file
+        object) the document is written there and the sink is returned.
+        Without PLANIFY_PDF_FONT pointing at a Unicode TTF, text is reduced
+        to the Latin-1 range of the core PDF fonts (emojis are dropped).
+        """
+        style = style or StyleSpec(data.get('template', 'simple'))
+        df = style.apply(df)
+        
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_auto_page_break(auto=True, margin=15)
+        
+        # Add custom font if available
+        font = 'Arial'
+        if PDF_FONT_PATH and os.path.exists(PDF_FONT_PATH):
+            font = 'Planify'
+            for font_style in ('', 'B', 'I'):
+                pdf.add_font(font, font_style, PDF_FONT_PATH)
+        text = ExportManager._pdf_text if font == 'Arial' else str
+        pdf.set_font(font, size=12)
+        
+        # Title
+        pdf.set_font(font, 'B', 24)
+        pdf.cell(200, 10, text="Planify Study Planner", new_x='LMARGIN', new_y='NEXT', align='C')
+        
+        # Subtitle
+        pdf.set_font(font, 'I', 14)
+        template_name = style.template.title()
+        plan_type = data.get('plan_type', 'Daily').title()
+        pdf.cell(200, 10, text=f"{plan_type} Schedule - {template_name} Style", new_x='LMARGIN', new_y='NEXT', align='C')
+        
+        # Add space
+        pdf.ln(10)
+        
+        # Project info
+        pdf.set_font(font, size=11)
+        pdf.cell(200, 10, text=text(f"Project: {data.get('folder_name', 'My Plan')}"), new_x='LMARGIN', new_y='NEXT')
+        pdf.cell(200, 10, text=f"Created: {datetime.now().strftime('%B %d, %Y')}", new_x='LMARGIN', new_y='NEXT')
+        
+        # Add space before table
+        pdf.ln(10)
+        
+        # Column widths follow content length, within sensible bounds
+        page_width = pdf.w - 2 * pdf.l_margin
+        columns = [df[col].to_numpy(dtype=object) for col in df.columns]
+        weights = np.array([
+            min(max(max((len(str(v)) for v in pd.unique(values)), default=0), len(str(col)), 6), 40)
+            for col, values in zip(df.columns, columns)
+        ], dtype=float)
+        widths = page_width * weights / weights.sum() if len(weights) else []
+        
+        # Table header
+        pdf.set_auto_page_break(False)
+        pdf.set_font(font, 'B', 10)
+        header = [ExportManager._pdf_wrap(pdf, text(str(col)), w) for col, w in zip(df.columns, widths)]
+        
+        def draw_header():
+            pdf.set_font(font, 'B', 10)
+            pdf.set_fill_color(108, 99, 255)  # Primary color
+            pdf.set_text_color(255, 255, 255)
+            ExportManager._pdf_row(pdf, header, widths, 6, fill=True)
+            pdf.set_font(font, size=9)
+            pdf.set_text_color(0, 0, 0)
+        
+        draw_header()
+        
+        # Table data
+        wrapped = {}
+        for row in zip(*columns):
+            cells = []
+            for j, value in enumerate(row):
+                lines = wrapped.get((j, value))
+                if lines is None:
+                    lines = wrapped[(j, value)] = ExportManager._pdf_wrap(pdf, text(str(value)), widths[j])
+                cells.append(lines)
+            height = max(len(lines) for lines in cells) * 5
+            if pdf.get_y() + height > pdf.page_break_trigger:
+                pdf.add_page()
+                draw_header()
+            ExportManager._pdf_row(pdf, cells, widths, 5)
+        pdf.set_auto_page_break(auto=True, margin=15)
+        
+        # Add motivational quote
+        pdf.ln(10)
+        pdf.set_font(font, 'I', 11)
+        quotes = [
+            "Success is the sum of small efforts repeated day in and day out.",
+            "The expert in anything was once a beginner.",
+            "Focus on progress, not perfection."
+        ]
+        pdf.multi_cell(0, 10, random.choice(quotes), align='C')
+        
+        if sink is not None:
+            pdf.output(sink)
+            return sink
+        return bytes(pdf.output())
+    
+    @staticmethod
+    def _pdf_text(value: str) -> str:
+        """Reduce text to what the core (Latin-1) PDF fonts can draw"""
+        return ' '.join(value.encode('latin-1', 'ignore').decode('latin-1').split())
+    
+    @staticmethod
+    def _pdf_wrap(pdf: FPDF, value: str, width: float) -> List[Tuple[str, float]]:
+        """Greedy word wrap of ``value`` into a cell; returns (line, x offset)
+        pairs that center each line in the cell"""
+        inner = width - 2 * pdf.c_margin
+        lines, line = [], ''
+        words = deque(value.split())
+        while words:
+            word = words.popleft()
+            candidate = f"{line} {word}" if line else word
+            if pdf.get_string_width(candidate) <= inner:
+                line = candidate
+            elif line:
+                lines.append(line)
+                line = ''
+                words.appendleft(word)
+            else:
+                # A single word wider than the cell is split by characters
+                cut = max(1, int(len(word) * inner / pdf.get_string_width(word)))
+                lines.append(word[:cut])
+                words.appendleft(word[cut:])
+        if line or not lines:
+            lines.append(line)
+        return [(line, (width - pdf.get_string_width(line)) / 2) for line in lines]
+    
+    @staticmethod
+    def _pdf_row(pdf: FPDF, cells: List[List[Tuple[str, float]]], widths, line_height: float, fill: bool = False):
+        """Draw one bordered table row of pre-wrapped cells at the cursor"""
+        height = max(len(lines) for lines in cells) * line_height
+        x, y = pdf.l_margin, pdf.get_y()
+        baseline = 0.5 * line_height + 0.3 * pdf.font_size
+        for width, lines in zip(widths, cells):
+            pdf.rect(x, y, width, height, style='DF' if fill else 'D')
+            for k, (line, offset) in enumerate(lines):
+                if line:
+                    pdf.text(x + offset, y + k * line_height + baseline, line)
+            x += width
+        pdf.set_xy(pdf.l_margin, y + height)
+    
+    @staticmethod
+    def to_excel(df: pd.DataFrame, data: Dict, style: Optional[StyleSpec] = None,
+                 sink: Optional[BinaryIO] = None) -> Union[bytes, BinaryIO]:
+        """Export to Excel, styled with ``style`` (default: the project's template)
+        
+        The workbook is written in xlsxwriter's constant_memory mode: each
+        row is written once, in order, with formats built up front. With
+        ``sink`` (a binary file object) the file is written there and the
+        sink is returned.
+        """
+        return ExportManager._excel_workbook([('Schedule', df)], data, style, sink)
+    
+    @staticmethod
+    def to_class_excel(schedules: Iterable[Tuple[str, pd.DataFrame]], data: Dict,
+                       style: Optional[StyleSpec] = None, sink: Optional[BinaryIO] = None) -> Union[bytes, BinaryIO]:
+        """Export a roster to one workbook with a sheet per student
+        
+        ``schedules`` is typically iter_schedules(batch); each sheet is
+        flushed as its frame arrives, so the roster is never held in memory.
+        """
+        return ExportManager._excel_workbook(schedules, data, style, sink)
+    
+    @staticmethod
+    def _excel_workbook(sheets: Iterable[Tuple[str, pd.DataFrame]], data: Dict,
+                        style: Optional[StyleSpec], sink: Optional[BinaryIO]) -> Union[bytes, BinaryIO]:
+        """Write (sheet name, frame) pairs plus an Info sheet to one workbook"""
+        style = style or StyleSpec(data.get('template', 'simple'))
+        output = sink if sink is not None else io.BytesIO()
+        workbook = xlsxwriter.Workbook(output, {
+            'constant_memory': True,
+            'strings_to_formulas': False,
+            'strings_to_urls': False,
+            'nan_inf_to_errors': True
+        })
+        formats = ExportManager._excel_formats(workbook, style.template)
+        
+        used = {'info'}
+        for name, frame in sheets:
+            worksheet = workbook.add_worksheet(ExportManager._sheet_name(name, used))
+            ExportManager._excel_sheet(worksheet, style.apply(frame), formats,
+                                       alternate=style.template == 'aesthetic')
+        
+        # Add project info sheet
+        info = workbook.add_worksheet('Info')
+        info.set_column(0, 1, 20)
+        rows = [
+            ('Property', 'Value'),
+            ('Project Name', data.get('folder_name', 'My Plan')),
+            ('Type', data.get('plan_type', 'daily')),
+            ('Template', style.template),
+            ('Created', datetime.now().strftime('%Y-%m-%d %H:%M'))
+        ]
+        for row_num, row in enumerate(rows):
+            info.write_row(row_num, 0, row, formats['info'] if row_num == 0 else None)
+        
+        workbook.close()
+        if sink is not None:
+            return sink
+        return output.getvalue()
+    
+    @staticmethod
+    def _excel_formats(workbook, template: str) -> Dict:
+        """Header/cell formats for ``template``, built once per workbook"""
+        if template == 'aesthetic':
+            # Aesthetic format
+            header_format = workbook.add_format({
+                'bold': True,
+                'text_wrap': True,
+                'valign': 'center',
+                'align': 'center',
+                'fg_color': '#FF6B9D',
+                'font_color': 'white',
+                'border': 1,
+                'font_size': 12
+            })
+            
+            cell_format = workbook.add_format({
+                'text_wrap': True,
+                'valign': 'center',
+                'align': 'center',
+                'border': 1,
+                'fg_color': '#FFF0F5'
+            })
+            
+            # Apply gradient-like effect with alternating colors
+            alt_format = workbook.add_format({
+                'text_wrap': True,
+                'valign': 'center',
+                'align': 'center',
+                'border': 1,
+                'fg_color': '#FFE0EC'
+            })
+            
+        elif template == 'minimal':
+            # Minimal format
+            header_format = workbook.add_format({
+                'bold': True,
+                'valign': 'center',
+                'align': 'center',
+                'fg_color': '#F5F5F5',
+                'border': 1
+            })
+            
+            cell_format = workbook.add_format({
+                'valign': 'center',
+                'align': 'center',
+                'border': 1
+            })
+            
+            alt_format = cell_format
+            
         else:
-            return self._offline_response(prompt)
-    
-    def _groq_chat(self, prompt: str, context: List) -> str:
-        """Chat using Groq"""
-        try:
-            messages = [
-                {"role": "system", "content": "You are Planify, a friendly AI study planner assistant. Help students create personalized study schedules."}
-            ]
-            if context:
-                messages.extend(context[-5:])  # Keep last 5 messages
-            messages.append({"role": "user", "content": prompt})
+            # Simple format
+            header_format = workbook.add_format({
+                'bold': True,
+                'border': 1
+            })
             
-            response = self.client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=1000
-            )
-            return response.choices[0].message.content
-        except:
-            return self._offline_response(prompt)
-    
-    def _openai_chat(self, prompt: str, context: List) -> str:
-        """Chat using OpenAI"""
-        try:
-            import openai
-            messages = [
-                {"role": "system", "content": "You are Planify, a friendly AI study planner assistant."}
-            ]
-            if context:
-                messages.extend(context[-5:])
-            messages.append({"role": "user", "content": prompt})
+            cell_format = workbook.add_format({
+                'border': 1
+            })
             
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=500
-            )
-            return response['choices'][0]['message']['content']
-        except:
-            return self._offline_response(prompt)
+            alt_format = cell_format
+        
+        info_format = workbook.add_format({'bold': True, 'border': 1})
+        return {'header': header_format, 'cell': cell_format, 'alt': alt_format, 'info': info_format}
     
-    def _offline_response(self, prompt: str) -> str:
-        """Offline fallback responses"""
-        responses = {
-            "greeting": "Hello! I'm Planify, your AI study assistant. Let's create your perfect study plan!",
-            "name": "Great choice! Let's move forward with your plan.",
-            "type": "Excellent selection! This will help structure your studies effectively.",
-            "problem": "I understand your challenge. We'll address this in your custom plan.",
-            "routine": "Thanks for sharing your routine. I'll optimize your schedule accordingly.",
-            "subjects": "Perfect! I'll organize these subjects for maximum efficiency.",
-            "template": "Beautiful choice! Your planner will look amazing.",
-            "success": "Your personalized planner is ready!"
-        }
+    @staticmethod
+    def _excel_sheet(worksheet, df: pd.DataFrame, formats: Dict, alternate: bool = False):
+        """Stream one frame into a constant_memory worksheet, row by row
         
-        for key in responses:
-            if key in prompt.lower():
-                return responses[key]
+        Rows are converted to Python values in chunks of EXCEL_CHUNK_ROWS,
+        and column widths are accumulated in the same pass (the column
+        table is only assembled when the workbook closes).
+        """
+        # Write headers
+        worksheet.write_row(0, 0, [str(col) for col in df.columns], formats['header'])
         
-        return "Let's continue building your perfect study plan!"
-
-# ==================== SCHEDULE GENERATOR ====================
-class ScheduleGenerator:
-    """Generate customized study schedules"""
+        # Write data with alternating row colors for aesthetic
+        longest = np.array([len(str(col)) for col in df.columns], dtype=int)
+        for start in range(0, len(df), EXCEL_CHUNK_ROWS):
+            chunk = df.iloc[start:start + EXCEL_CHUNK_ROWS]
+            columns = [chunk[col].to_numpy(dtype=object, na_value=None) for col in df.columns]
+            longest = np.maximum(longest, ExportManager._excel_widths(columns))
+            for row_num, values in enumerate(zip(*columns), start=start + 1):
+                format_to_use = formats['alt'] if (alternate and row_num % 2 == 1) else formats['cell']
+                worksheet.write_row(row_num, 0, values, format_to_use)
+        
+        # Adjust column widths
+        for i, length in enumerate(longest):
+            worksheet.set_column(i, i, min(int(length) + 2, 30))
     
     @staticmethod
-    def create_schedule(data: Dict) -> pd.DataFrame:
-        """Create schedule based on user data"""
-        plan_type = data.get('plan_type', 'daily')
-        
-        if plan_type == 'daily':
-            return ScheduleGenerator._daily_schedule(data)
-        elif plan_type == 'weekly':
-            return ScheduleGenerator._weekly_schedule(data)
-        else:
-            return ScheduleGenerator._monthly_schedule(data)
+    def _excel_widths(columns: List[np.ndarray]) -> np.ndarray:
+        """Longest text length per column, from one factorized pass over every cell"""
+        if not columns or not len(columns[0]):
+            return np.zeros(len(columns), dtype=int)
+        codes, uniques = pd.factorize(np.concatenate(columns))
+        lengths = np.fromiter((len(str(value)) for value in uniques), dtype=int, count=len(uniques))
+        return np.append(lengths, 0)[codes].reshape(len(columns), -1).max(axis=1)
     
     @staticmethod
-    def _daily_schedule(data: Dict) -> pd.DataFrame:
-        """Generate daily schedule"""
-        routine = data.get('routine', {})
-        subjects = data.get('subjects', ['Math', 'Science', 'English'])
+    def _sheet_name(name: str, used: set) -> str:
+        """Valid, unique Excel sheet name (31 chars, no []:*?/\\)"""
+        base = re.sub(r"[\[\]:*?/\\]", '_', str(name)).strip("'")[:31] or 'Sheet'
+        candidate, n = base, 1
+        while candidate.lower() in used:
+            n += 1
+            suffix = f" ({n})"
+            candidate = base[:31 - len(suffix)] + suffix
+        used.add(candidate.lower())
+        return candidate
+    
+    @staticmethod
+    def to_docx(df: pd.DataFrame, data: Dict, style: Optional[StyleSpec] = None,
+                sink: Optional[BinaryIO] = None) -> Union[bytes, BinaryIO]:
+        """Export to Word, styled with ``style`` (default: the project's template)
         
-        schedule = []
+        Only the header goes through python-docx's per-cell API, which is
+        slow; body rows are generated as one WordprocessingML fragment,
+        parsed once and appended to the table. The header repeats on every
+        page. With ``sink`` the file is written there and the sink is returned.
+        """
+        style = style or StyleSpec(data.get('template', 'simple'))
+        df = style.apply(df)
+        look = DOCX_TEMPLATES.get(style.template, DOCX_TEMPLATES['simple'])
         
-        # Morning routine
-        wake_time = routine.get('wake_time', '07:00')
-        schedule.append({
-            'Time': wake_time,
-            'Activity': '🌅 Wake Up & Morning Routine',
-            'Duration': '30 min',
-            'Type': 'Personal',
-            'Energy Level': '🔋 Building'
-        })
+        document = Document()
+        section = document.sections[0]
+        section.left_margin = section.right_margin = Inches(0.7)
         
-        # Breakfast
-        breakfast_time = routine.get('breakfast_time', '08:00')
-        schedule.append({
-            'Time': breakfast_time,
-            'Activity': '🍳 Breakfast',
-            'Duration': '30 min',
-            'Type': 'Meal',
-            'Energy Level': '🔋🔋 Good'
-        })
+        # Title
+        title = document.add_heading("Planify Study Planner", level=0)
+        title.alignment = WD_ALIGN_PARAGRAPH.CENTER
         
-        # Study sessions based on user preferences
-        study_sessions = routine.get('study_sessions', [])
-        if study_sessions:
-            for i, session in enumerate(study_sessions):
-                subject = subjects[i % len(subjects)] if subjects else f'Subject {i+1}'
-                schedule.append({
-                    'Time': session.get('start_time', f'{9+i*2}:00'),
-                    'Activity': f'📚 Study: {subject}',
-                    'Duration': session.get('duration', '2 hours'),
-                    'Type': 'Study',
-                    'Energy Level': '🔋🔋🔋 Peak'
-                })
-                
-                # Add break
-                schedule.append({
-                    'Time': session.get('break_time', f'{10+i*2}:45'),
-                    'Activity': '☕ Break',
-                    'Duration': '15 min',
-                    'Type': 'Break',
-                    'Energy Level': '🔋 Recharge'
-                })
-        else:
-            # Default study sessions
-            times = ['09:00', '11:30', '14:00', '16:30', '19:00']
-            for i, time in enumerate(times[:len(subjects)]):
-                schedule.append({
-                    'Time': time,
-                    'Activity': f'📚 Study: {subjects[i % len(subjects)]}',
-                    'Duration': '2 hours',
-                    'Type': 'Study',
-                    'Energy Level': '🔋🔋🔋 Peak'
-                })
+        # Subtitle
+        subtitle = document.add_paragraph()
+        subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        run = subtitle.add_run(f"{data.get('plan_type', 'Daily').title()} Schedule - {style.template.title()} Style")
+        run.italic = True
+        run.font.size = Pt(14)
         
-        # Lunch
-        lunch_time = routine.get('lunch_time', '13:00')
-        schedule.append({
-            'Time': lunch_time,
-            'Activity': '🍽️ Lunch',
-            'Duration': '45 min',
-            'Type': 'Meal',
-            'Energy Level': '🔋🔋 Good'
-        })
+        # Project info
+        document.add_paragraph(f"Project: {data.get('folder_name', 'My Plan')}")
+        document.add_paragraph(f"Created: {datetime.now().strftime('%B %d, %Y')}")
         
-        # Dinner
-        dinner_time = routine.get('dinner_time', '19:30')
-        schedule.append({
-            'Time': dinner_time,
-            'Activity': '🍝 Dinner',
-            'Duration': '45 min',
-            'Type': 'Meal',
-            'Energy Level': '🔋🔋 Good'
-        })
+        # Table header
+        table = document.add_table(rows=1, cols=len(df.columns))
+        table.style = 'Table Grid'
+        header = table.rows[0]
+        header._tr.get_or_add_trPr().append(parse_xml(f'<w:tblHeader {nsdecls("w")}/>'))
+        for cell, col in zip(header.cells, df.columns):
+            paragraph = cell.paragraphs[0]
+            run = paragraph.add_run(str(col))
+            run.bold = True
+            if look['center']:
+                paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            if look['header_color']:
+                run.font.color.rgb = RGBColor.from_string(look['header_color'])
+            if look['header_fill']:
+                cell._tc.get_or_add_tcPr().append(
+                    parse_xml(f'<w:shd {nsdecls("w")} w:val="clear" w:color="auto" w:fill="{look["header_fill"]}"/>'))
         
-        # Sleep
-        sleep_time = routine.get('sleep_time', '22:30')
-        schedule.append({
-            'Time': sleep_time,
-            'Activity': '😴 Sleep Preparation',
-            'Duration': '30 min',
-            'Type': 'Personal',
-            'Energy Level': '🔋 Winding Down'
-        })
+        # Table data in one bulk insertion
+        rows = parse_xml(f'<w:tbl {nsdecls("w")}>{ExportManager._docx_rows(df, look)}</w:tbl>')
+        table._tbl.extend(list(rows))
         
-        # Sort by time
-        df = pd.DataFrame(schedule)
-        df['Time'] = pd.to_datetime(df['Time'], format='%H:%M').dt.time
-        df = df.sort_values('Time')
-        df['Time'] = df['Time'].astype(str).str[:5]
+        # Add motivational quote
+        quotes = [
+            "Success is the sum of small efforts repeated day in and day out.",
+            "The expert in anything was once a beginner.",
+            "Focus on progress, not perfection."
+        ]
+        quote = document.add_paragraph()
+        quote.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        quote.add_run(random.choice(quotes)).italic = True
         
-        return df
+        output = sink if sink is not None else io.BytesIO()
+        document.save(output)
+        if sink is not None:
+            return sink
+        return output.getvalue()
     
     @staticmethod
-    def _weekly_schedule(data: Dict) -> pd.DataFrame:
-        """Generate weekly schedule"""
-        subjects = data.get('subjects', ['Math', 'Science', 'English'])
+    def _docx_rows(df: pd.DataFrame, look: Dict) -> str:
+        """WordprocessingML <w:tr> elements for every row of ``df``
         
-        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        schedule = []
+        Cell markup is built once per distinct (value, fill) pair.
+        """
+        align = '<w:pPr><w:jc w:val="center"/></w:pPr>' if look['center'] else ''
+        fills = look['fills']
+        markup = {}
+        rows = []
+        columns = [df[col].to_numpy(dtype=object, na_value='') for col in df.columns]
+        for i, values in enumerate(zip(*columns)):
+            fill = fills[i % len(fills)]
+            cells = []
+            for value in values:
+                cell = markup.get((value, fill))
+                if cell is None:
+                    shading = f'<w:tcPr><w:shd w:val="clear" w:color="auto" w:fill="{fill}"/></w:tcPr>' if fill else ''
+                    text = xml_escape(XML_ILLEGAL_PATTERN.sub('', str(value)))
+                    cell = markup[(value, fill)] = (f'<w:tc>{shading}<w:p>{align}<w:r>'
+                                                    f'<w:t xml:space="preserve">{text}</w:t></w:r></w:p></w:tc>')
+                cells.append(cell)
+            rows.append(f"<w:tr>{''.join(cells)}</w:tr>")
+        return ''.join(rows)
+    
+    @staticmethod
+    def to_png(df: pd.DataFrame, data: Dict, style: Optional[StyleSpec] = None) -> bytes:
+        """Export a phone-wallpaper PNG of the schedule (see PngRenderer)"""
+        return get_png_renderer().render(df, data, style or StyleSpec(data.get('template', 'simple')))
+    
+    @staticmethod
+    def to_ics(df: pd.DataFrame, data: Dict, style: Optional[StyleSpec] = None,
+               sink: Optional[BinaryIO] = None) -> Union[bytes, BinaryIO]:
+        """Export to an iCalendar file that calendar apps can subscribe to
         
-        for i, day in enumerate(days):
-            if day == 'Sunday':
-                schedule.append({
-                    'Day': day,
-                    'Morning (7-12)': '🌅 Rest/Light Review',
-                    'Afternoon (12-5)': '📝 Weekly Planning',
-                    'Evening (5-10)': '🎯 Goal Setting',
-                    'Focus Subject': 'Review Week',
-                    'Special Notes': '✨ Recharge Day'
-                })
-            else:
-                subject_index = i % len(subjects)
-                schedule.append({
-                    'Day': day,
-                    'Morning (7-12)': f'📚 {subjects[subject_index]}',
-                    'Afternoon (12-5)': f'✍️ Practice {subjects[(subject_index + 1) % len(subjects)]}',
-                    'Evening (5-10)': '📖 Review & Homework',
-                    'Focus Subject': subjects[subject_index],
-                    'Special Notes': '💪 Stay Focused!'
-                })
+        Daily rows become events repeating FREQ=DAILY, and each distinct
+        weekly slot activity becomes one FREQ=WEEKLY event whose BYDAY lists
+        every day it occurs, so a semester is a few dozen events rather than
+        one per occurrence. Recurrence runs from ``start_date`` (default
+        today) to ``exam_date``, or for ICS_SEMESTER_WEEKS. Horizon sessions
+        are dated all-day events and monthly phases span their week. Events
+        are written to ``sink`` as they are produced when one is given.
+        """
+        output = sink if sink is not None else io.BytesIO()
+        for chunk in ExportManager.iter_ics(df, data, style):
+            output.write(chunk)
+        return output if sink is not None else output.getvalue()
+    
+    @staticmethod
+    def iter_ics(df: pd.DataFrame, data: Dict, style: Optional[StyleSpec] = None) -> Iterator[bytes]:
+        """Yield one plan's calendar as encoded chunks, one VEVENT at a time"""
+        style = style or StyleSpec(data.get('template', 'simple'))
+        owner = str(data.get('student_id') or data.get('folder_name', 'My Plan'))
+        start = _as_date(data.get('start_date')) or datetime.now().date()
+        exam = _as_date(data.get('exam_date'))
+        until = exam if exam and exam > start else start + timedelta(weeks=ICS_SEMESTER_WEEKS)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
         
-        return pd.DataFrame(schedule)
+        yield ExportManager._ics_lines([
+            'BEGIN:VCALENDAR',
+            'VERSION:2.0',
+            'PRODID:-//Planify//Study Planner//EN',
+            'CALSCALE:GREGORIAN',
+            'METHOD:PUBLISH',
+            f"X-WR-CALNAME:{ExportManager._ics_text(data.get('folder_name', 'My Plan'))}"
+        ])
+        for identity, properties in ExportManager._ics_events(df, style.apply(df), start, until):
+            # UIDs depend only on who and which slot, never on times or text,
+            # so re-importing an edited plan updates events instead of duplicating them
+            uid = hashlib.sha1('|'.join([owner] + identity).encode('utf-8')).hexdigest()[:24]
+            yield ExportManager._ics_lines(['BEGIN:VEVENT', f'UID:{uid}@planify', f'DTSTAMP:{stamp}']
+                                           + properties + ['END:VEVENT'])
+        yield ExportManager._ics_lines(['END:VCALENDAR'])
     
     @staticmethod
-    def _monthly_schedule(data: Dict) -> pd.DataFrame:
-        """Generate monthly schedule"""
-        subjects = data.get('subjects', ['Math', 'Science', 'English'])
+    def iter_class_ics(batch: Iterable[Dict], processes: int = None,
+                       style: Optional[StyleSpec] = None) -> Iterator[Tuple[str, bytes]]:
+        """Stream (file name, .ics bytes) for every student of a roster
         
-        weeks = ['Week 1', 'Week 2', 'Week 3', 'Week 4']
-        schedule = []
+        Plans come from iter_schedules and each calendar uses the student's
+        own project_data (start and exam dates), so only the students in
+        flight are ever held in memory.
+        """
+        batch, inputs = itertools.tee(batch)
+        for (student, frame), data in zip(iter_schedules(batch, processes), inputs):
+            payload = ExportManager.to_ics(frame, {**data, 'student_id': student}, style)
+            if payload is not None:
+                yield f'{ExportManager._file_stem(student)}.ics', payload
+    
+    @staticmethod
+    def _ics_events(df: pd.DataFrame, styled: pd.DataFrame, start,
+                    until) -> Iterator[Tuple[List[str], List[str]]]:
+        """(identity, VEVENT property lines) for a plan frame
         
-        for i, week in enumerate(weeks):
-            schedule.append({
-                'Week': week,
-                'Phase': ['Foundation', 'Development', 'Advanced', 'Revision'][i],
-                'Focus Areas': ', '.join(subjects),
-                'Target': f'{(i+1)*25}% Complete',
-                'Milestones': ['Basics Clear', 'Practice Started', 'Mock Tests', 'Final Review'][i],
-                'Motivation': ['🚀 Strong Start!', '💪 Keep Going!', '🎯 Almost There!', '🏆 Final Push!'][i]
-            })
+        Times, dates and durations are read from the raw frame ``df``;
+        summaries and descriptions from its styled copy. The identity names
+        the event's row kind and slot or activity, numbered when repeated.
+        """
+        text = ExportManager._ics_text
+        column = lambda name: styled[name] if name in styled.columns else itertools.repeat('')
+        recurrence = f'UNTIL={until:%Y%m%d}T235959'
+        midnight = datetime.combine(start, datetime.min.time())
+        seen = {}
         
-        return pd.DataFrame(schedule)
-
-# ==================== TEMPLATE STYLER ====================
-class TemplateStyler:
-    """Apply different visual styles to schedules"""
+        def identity(*key) -> List[str]:
+            seen[key] = seen.get(key, 0) + 1
+            return [str(part) for part in key] + [str(seen[key])]
+        
+        if {'Time', 'Activity', 'Duration'} <= set(df.columns):
+            starts = plan_minutes(df['Time'])
+            lengths = label_minutes(df['Duration'], duration_minutes)
+            categories = df['Type'] if 'Type' in df.columns else itertools.repeat('Study')
+            rows = zip(starts, lengths, categories, df['Activity'], column('Activity'), column('Type'),
+                       column('Energy Level'))
+            for minute, length, category, raw, activity, kind, energy in rows:
+                begin = midnight + timedelta(minutes=int(minute))
+                yield identity('daily', raw), [f'DTSTART:{begin:%Y%m%dT%H%M%S}', f'DURATION:PT{length}M',
+                       f'RRULE:FREQ=DAILY;{recurrence}', f'SUMMARY:{text(activity)}',
+                       f"DESCRIPTION:{text(' · '.join(str(v) for v in (kind, energy) if v))}",
+                       f'CATEGORIES:{text(category)}']
+        
+        elif 'Day' in df.columns and 'Date' not in df.columns:
+            # One event per (slot, activity); the days it repeats on go into BYDAY
+            days = [ICS_WEEKDAYS[day] for day in df['Day']]
+            weekdays = list(ICS_WEEKDAYS.values())
+            for name in df.columns:
+                hours = ExportManager._slot_hours(name)
+                if not hours:
+                    continue
+                first, last = hours
+                occurrences, titles = {}, {}
+                for day, activity, title in zip(days, df[name], styled[name]):
+                    occurrences.setdefault(activity, []).append(day)
+                    titles.setdefault(activity, title)
+                for activity, on in occurrences.items():
+                    # DTSTART must be the first occurrence on or after the start date
+                    lead = next(d for d in range(7) if weekdays[(start.weekday() + d) % 7] in on)
+                    begin = midnight + timedelta(days=lead, hours=first)
+                    yield identity('weekly', name, activity), [f'DTSTART:{begin:%Y%m%dT%H%M%S}', f'DURATION:PT{last - first}H',
+                           f"RRULE:FREQ=WEEKLY;BYDAY={','.join(on)};{recurrence}",
+                           f'SUMMARY:{text(titles[activity])}', f'DESCRIPTION:{text(name)}', 'CATEGORIES:Study']
+        
+        elif 'Date' in df.columns:
+            for day, key, subject, session, phase, length in zip(df['Date'], df['Subject'], column('Subject'),
+                                                                 column('Session'), column('Phase'),
+                                                                 column('Duration')):
+                begin = _as_date(day)
+                yield identity('session', key), [f'DTSTART;VALUE=DATE:{begin:%Y%m%d}', f'DTEND;VALUE=DATE:{begin + timedelta(days=1):%Y%m%d}',
+                       f'SUMMARY:{text(f"{subject} · {session}")}',
+                       f"DESCRIPTION:{text(' · '.join(str(v) for v in (phase, length) if v))}", 'CATEGORIES:Study']
+        
+        elif 'Week' in df.columns:
+            details = [name for name in styled.columns if name not in ('Week', 'Phase')]
+            for week, row in enumerate(styled.itertuples(index=False)):
+                row = dict(zip(styled.columns, row))
+                begin = start + timedelta(weeks=week)
+                yield identity('week', week), [f'DTSTART;VALUE=DATE:{begin:%Y%m%d}', f'DTEND;VALUE=DATE:{begin + timedelta(weeks=1):%Y%m%d}',
+                       f"SUMMARY:{text(' · '.join(str(row[name]) for name in ('Week', 'Phase') if name in row))}",
+                       f"DESCRIPTION:{text(chr(10).join(f'{name}: {row[name]}' for name in details))}",
+                       'CATEGORIES:Study']
+        
+        else:
+            raise ValueError(f"no calendar layout for columns {list(df.columns)}")
     
     @staticmethod
-    def apply_style(df: pd.DataFrame, template: str) -> pd.DataFrame:
-        """Apply template styling"""
-        if template == 'aesthetic':
-            return TemplateStyler._aesthetic_style(df)
-        elif template == 'minimal':
-            return TemplateStyler._minimal_style(df)
-        else:
-            return df  # Simple style - no modifications
+    def _slot_hours(name) -> Optional[Tuple[int, int]]:
+        """(start, end) hour of a weekly column such as 'Evening (5-10)', else None"""
+        hours = SLOT_HOURS_PATTERN.search(str(name))
+        if not hours:
+            return None
+        first, last = (int(hour) for hour in hours.groups())
+        first += 12 if first < 7 else 0
+        last += 12 if last <= first else 0
+        return first, last
     
     @staticmethod
-    def _aesthetic_style(df: pd.DataFrame) -> pd.DataFrame:
-        """Apply aesthetic styling with emojis and colors"""
-        styled_df = df.copy()
+    def _ics_text(value) -> str:
+        """Escape a TEXT property value (RFC 5545 3.3.11)"""
+        return str(value).translate(ICS_ESCAPES)
+    
+    @staticmethod
+    def _ics_lines(lines: List[str]) -> bytes:
+        """Encode content lines with CRLF, folding each at 75 octets"""
+        folded = []
+        for line in lines:
+            raw = line.encode('utf-8')
+            limit = ICS_LINE_OCTETS
+            while len(raw) > limit:
+                cut = limit
+                while raw[cut] & 0xC0 == 0x80:  # never split a UTF-8 sequence
+                    cut -= 1
+                folded.append(raw[:cut])
+                raw = b' ' + raw[cut:]
+            folded.append(raw)
+        return b'\r\n'.join(folded) + b'\r\n'
+    
+    @staticmethod
+    def _file_stem(name: str) -> str:
+        """File-system safe version of a student or project name"""
+        return re.sub(r'[^\w.-]+', '_', str(name)).strip('._') or 'plan'
+    
+    @staticmethod
+    def to_arrow_table(df: pd.DataFrame, data: Dict):
+        """Typed, columnar form of a plan as a pyarrow Table
         
-        # Add decorative elements
-        emoji_decorations = ['✨', '🌟', '💫', '⭐', '🌈']
+        Times and durations become int16 minutes (start_minute counts from
+        the start of the plan day, so sessions after midnight exceed 1440),
+        Type, Energy Level, Phase and Day are dictionaries with the fixed
+        codes of PLAN_ENUMS, and every other text column, including the subject
+        parsed from study activities, is dictionary encoded. Weekly plans
+        are unpivoted to one row per day and time slot. Numeric columns are
+        handed to Arrow without copying. Plan-level fields are stored in the
+        schema metadata.
+        """
+        pa = importlib.import_module('pyarrow')
+        columns = ExportManager._typed_columns(df)
+        table = pa.table({name: ExportManager._arrow_array(pa, values) for name, values in columns.items()})
+        metadata = {'plan_type': data.get('plan_type', 'daily'), 'folder_name': data.get('folder_name', 'My Plan'),
+                    'student_id': data.get('student_id') or '', 'fingerprint': plan_fingerprint(df)}
+        return table.replace_schema_metadata({f'planify.{k}': str(v) for k, v in metadata.items()})
+    
+    @staticmethod
+    def to_parquet(df: pd.DataFrame, data: Dict, style: Optional[StyleSpec] = None,
+                   sink: Optional[BinaryIO] = None) -> Union[bytes, BinaryIO]:
+        """Export to zstd-compressed Parquet (see to_arrow_table)
         
-        # Add random decorative emojis to some cells
-        for col in styled_df.columns:
-            if col not in ['Time', 'Day', 'Week']:
-                for idx in styled_df.index:
-                    if random.random() > 0.7:  # 30% chance
-                        current_val = str(styled_df.at[idx, col])
-                        decoration = random.choice(emoji_decorations)
-                        styled_df.at[idx, col] = f"{current_val} {decoration}"
+        ``style`` is accepted for the exporter interface only: analytics
+        data is never decorated.
+        """
+        pq = importlib.import_module('pyarrow.parquet')
+        output = sink if sink is not None else io.BytesIO()
+        pq.write_table(ExportManager.to_arrow_table(df, data), output, compression='zstd')
+        return output if sink is not None else output.getvalue()
+    
+    @staticmethod
+    def to_arrow(df: pd.DataFrame, data: Dict, style: Optional[StyleSpec] = None,
+                 sink: Optional[BinaryIO] = None) -> Union[bytes, BinaryIO]:
+        """Export to an uncompressed Arrow IPC file
         
-        return styled_df
+        Readers can memory-map the result (pyarrow.ipc.open_file on
+        pyarrow.memory_map) and use the columns without copying or parsing.
+        """
+        pa = importlib.import_module('pyarrow')
+        table = ExportManager.to_arrow_table(df, data)
+        output = sink if sink is not None else io.BytesIO()
+        with pa.ipc.new_file(output, table.schema) as writer:
+            writer.write_table(table)
+        return output if sink is not None else output.getvalue()
     
     @staticmethod
-    def _minimal_style(df: pd.DataFrame) -> pd.DataFrame:
-        """Apply minimal clean styling"""
-        styled_df = df.copy()
+    def to_class_parquet(batch: Iterable[Dict], sink: BinaryIO, processes: int = None) -> BinaryIO:
+        """Stream a roster into one Parquet file with a leading 'student' column
         
-        # Remove emojis for minimal look
-        for col in styled_df.columns:
-            styled_df[col] = styled_df[col].astype(str).str.replace(r'[^\w\s:]', '', regex=True)
+        Plans come from iter_schedules and are buffered into row groups of
+        about PARQUET_ROW_GROUP_ROWS rows, so memory is bounded by one row
+        group. All students must share a plan type (one schema per file).
+        """
+        pa = importlib.import_module('pyarrow')
+        pq = importlib.import_module('pyarrow.parquet')
+        batch, inputs = itertools.tee(batch)
+        writer, pending, rows = None, [], 0
+        for (student, frame), data in zip(iter_schedules(batch, processes), inputs):
+            table = ExportManager.to_arrow_table(frame, {**data, 'student_id': student})
+            table = table.add_column(0, 'student', pa.array([student] * table.num_rows).dictionary_encode())
+            pending.append(table.replace_schema_metadata(None))
+            rows += table.num_rows
+            if rows >= PARQUET_ROW_GROUP_ROWS:
+                writer = writer or pq.ParquetWriter(sink, pending[0].schema, compression='zstd')
+                writer.write_table(pa.concat_tables(pending, promote_options='permissive'))
+                pending, rows = [], 0
+        if pending:
+            writer = writer or pq.ParquetWriter(sink, pending[0].schema, compression='zstd')
+            writer.write_table(pa.concat_tables(pending, promote_options='permissive'))
+        if writer:
+            writer.close()
+        return sink
+    
+    @staticmethod
+    def _typed_columns(df: pd.DataFrame) -> Dict:
+        """Plan frame as {column: numpy array or Categorical} with parsed types"""
+        columns = {}
+        if 'Day' in df.columns and 'Date' not in df.columns:
+            df, columns = ExportManager._weekly_slots(df)
+        if 'Date' in df.columns:
+            columns['date'] = pd.to_datetime(df['Date']).to_numpy().astype('datetime64[D]')
+        if 'Week' in df.columns:
+            columns['week'] = df['Week'].str.extract(r'(\d+)', expand=False).astype(np.int16).to_numpy()
+        if 'Time' in df.columns:
+            columns['start_minute'] = plan_minutes(df['Time'])
+        if 'Duration' in df.columns:
+            columns['duration_minutes'] = label_minutes(df['Duration'], duration_minutes)
+            if 'start_minute' in columns:
+                columns['end_minute'] = columns['start_minute'] + columns['duration_minutes']
         
-        return styled_df
+        for name in df.columns:
+            if name in ('Date', 'Week', 'Time', 'Duration'):
+                continue
+            columns[ExportManager._column_name(name)] = categorical(df[name], PLAN_ENUMS.get(name, ()))
+        if 'Activity' in df.columns and 'Subject' not in df.columns and 'Focus Subject' not in df.columns:
+            columns['subject'] = study_subjects(columns['activity'])
+        return columns
+    
+    @staticmethod
+    def _weekly_slots(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict]:
+        """Unpivot a weekly frame to one row per (day, time slot), plus its minute columns"""
+        slots = [name for name in df.columns if ExportManager._slot_hours(name)]
+        hours = np.array([ExportManager._slot_hours(name) for name in slots], dtype=np.int16) * 60
+        long = df.drop(columns=slots).iloc[np.repeat(np.arange(len(df)), len(slots))].reset_index(drop=True)
+        long.insert(1, 'Slot', np.tile(np.array(slots, dtype=object), len(df)))
+        long.insert(2, 'Activity', df[slots].to_numpy().ravel())
+        bounds = np.tile(hours, (len(df), 1))
+        return long, {'start_minute': bounds[:, 0], 'end_minute': bounds[:, 1],
+                      'duration_minutes': bounds[:, 1] - bounds[:, 0]}
+    
+    @staticmethod
+    def _arrow_array(pa, values):
+        """Arrow array over a numpy column or Categorical, reusing its buffers"""
+        if isinstance(values, pd.Categorical):
+            codes = values.codes.astype(np.int32, copy=False)
+            missing = codes < 0
+            return pa.DictionaryArray.from_arrays(pa.array(codes, mask=missing if missing.any() else None),
+                                                  pa.array([str(value) for value in values.categories], pa.string()))
+        return pa.array(values)
+    
+    @staticmethod
+    def _column_name(name: str) -> str:
+        """snake_case column name for analytics exports ('Energy Level' -> 'energy_level')"""
+        return re.sub(r'\W+', '_', str(name)).strip('_').lower()
+    
+    @staticmethod
+    def to_csv(df: pd.DataFrame, style: Optional[StyleSpec] = None) -> bytes:
+        """Export to CSV, styled with ``style`` when given"""
+        if style:
+            df = style.apply(df)
+        return df.to_csv(index=False).encode('utf-8')
 
-# ==================== EXPORT MANAGER ====================
-class ExportManager:
-    """Handle all export operations"""
+class PngRenderer:
+    """Renders a schedule table as a shareable, wallpaper-sized PNG
+    
+    Everything that repeats between images is cached: fonts and
+    per-character advance widths per (size, weight), rendered text masks
+    per string, and each template's background, both as pixels and as
+    pre-compressed PNG bands. Finished images live in a content-addressed
+    LRU keyed on the plan fingerprint and the fields drawn in the title.
+    """
+    
+    def __init__(self, size: Tuple[int, int] = PNG_SIZE, max_images: int = 256):
+        self.size = size
+        self.images = LRUCache(max_images)
+        self._runs = LRUCache(4096)
+        self._fonts = {}
+        self._advances = {}
+        self._backgrounds = {}
+        self._texts = LRUCache(4096)
+        self._glyphs = LRUCache(4096)
+        self._notdef = None
+    
+    def render(self, df: pd.DataFrame, data: Dict, style: StyleSpec) -> bytes:
+        """PNG bytes for ``df`` styled with ``style``; identical inputs hit the cache"""
+        title = (data.get('folder_name') or 'My Plan', data.get('plan_type') or 'daily')
+        key = hashlib.sha256(json.dumps([style.plan_key or plan_fingerprint(df), style.template, title,
+                                         self.size]).encode('utf-8')).hexdigest()
+        image = self.images.get(key)
+        if image is None:
+            image = self._draw(style.apply(df), style.template, title)
+            self.images.set(key, image)
+        return image
+    
+    def font(self, size: int, bold: bool = False):
+        key = (size, bold)
+        if key not in self._fonts:
+            self._fonts[key] = self._load_font(size, bold)
+        return self._fonts[key]
     
     @staticmethod
-    def to_pdf(df: pd.DataFrame, data: Dict) -> bytes:
-        """Export to PDF"""
-        try:
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_auto_page_break(auto=True, margin=15)
-            
-            # Add custom font if available
-            pdf.set_font("Arial", size=12)
-            
-            # Title
-            pdf.set_font("Arial", 'B', 24)
-            pdf.cell(200, 10, txt="Planify Study Planner", ln=True, align='C')
-            
-            # Subtitle
-            pdf.set_font("Arial", 'I', 14)
-            template_name = data.get('template', 'Simple').title()
-            plan_type = data.get('plan_type', 'Daily').title()
-            pdf.cell(200, 10, txt=f"{plan_type} Schedule - {template_name} Style", ln=True, align='C')
-            
-            # Add space
-            pdf.ln(10)
-            
-            # Project info
-            pdf.set_font("Arial", size=11)
-            pdf.cell(200, 10, txt=f"Project: {data.get('folder_name', 'My Plan')}", ln=True)
-            pdf.cell(200, 10, txt=f"Created: {datetime.now().strftime('%B %d, %Y')}", ln=True)
-            
-            # Add space before table
-            pdf.ln(10)
-            
-            # Calculate column widths
-            page_width = pdf.w - 2 * pdf.l_margin
-            col_count = len(df.columns)
-            col_width = page_width / col_count
-            
-            # Table header
-            pdf.set_font("Arial", 'B', 10)
-            pdf.set_fill_color(108, 99, 255)  # Primary color
-            pdf.set_text_color(255, 255, 255)
-            
-            for col in df.columns:
-                pdf.cell(col_width, 10, str(col), 1, 0, 'C', True)
-            pdf.ln()
-            
-            # Table data
-            pdf.set_font("Arial", size=9)
-            pdf.set_text_color(0, 0, 0)
-            
-            for _, row in df.iterrows():
-                for col in df.columns:
-                    value = str(row[col])
-                    # Truncate long text
-                    if len(value) > 20:
-                        value = value[:17] + "..."
-                    pdf.cell(col_width, 8, value, 1, 0, 'C')
-                pdf.ln()
-            
-            # Add motivational quote
-            pdf.ln(10)
-            pdf.set_font("Arial", 'I', 11)
-            quotes = [
-                "Success is the sum of small efforts repeated day in and day out.",
-                "The expert in anything was once a beginner.",
-                "Focus on progress, not perfection."
-            ]
-            pdf.multi_cell(0, 10, random.choice(quotes), align='C')
-            
-            return pdf.output(dest='S').encode('latin-1')
-            
-        except Exception as e:
-            st.error(f"PDF generation error: {e}")
-            return None
+    def _load_font(size: int, bold: bool):
+        names = [PNG_FONT_PATH] if PNG_FONT_PATH else []
+        names.append('DejaVuSans-Bold.ttf' if bold else 'DejaVuSans.ttf')
+        for name in names:
+            try:
+                return ImageFont.truetype(name, size)
+            except OSError:
+                continue
+        return ImageFont.load_default(size)
+    
+    def text_width(self, text: str, size: int, bold: bool = False) -> float:
+        """Width of ``text`` from cached per-character advances"""
+        advances = self._advances.setdefault((size, bold), {})
+        width = 0.0
+        for char in text:
+            advance = advances.get(char)
+            if advance is None:
+                advance = advances[char] = self.font(size, bold).getlength(char)
+            width += advance
+        return width
+    
+    def fit(self, text: str, width: float, size: int, bold: bool = False) -> str:
+        """``text`` shortened with an ellipsis to fit ``width`` pixels"""
+        if self.text_width(text, size, bold) <= width:
+            return text
+        budget = width - self.text_width('…', size, bold)
+        while text and self.text_width(text, size, bold) > budget:
+            text = text[:-1]
+        return text.rstrip() + '…'
+    
+    def has_glyph(self, char: str) -> bool:
+        """Whether the font draws ``char`` as something other than .notdef"""
+        supported = self._glyphs.get(char)
+        if supported is None:
+            font = self.font(PNG_FONT_SIZES[0])
+            signature = lambda glyph: (font.getmask(glyph).size, font.getmask(glyph).histogram())
+            if self._notdef is None:
+                self._notdef = signature('\uffff')
+            supported = char.isspace() or signature(char) != self._notdef
+            self._glyphs.set(char, supported)
+        return supported
+    
+    def text(self, canvas: Image.Image, xy: Tuple[float, float], text: str, size: int,
+             color: Tuple[int, int, int], bold: bool = False, anchor: str = 'lm'):
+        """Draw ``text`` anchored at ``xy`` from a cached glyph-run mask"""
+        key = (text, size, bold, anchor)
+        run = self._runs.get(key)
+        if run is None:
+            font = self.font(size, bold)
+            left, top, right, bottom = font.getbbox(text, anchor=anchor)
+            mask = Image.new('L', (max(1, right - left), max(1, bottom - top)))
+            ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255, anchor=anchor)
+            run = (mask, left, top)
+            self._runs.set(key, run)
+        mask, left, top = run
+        canvas.paste(color, (int(xy[0]) + left, int(xy[1]) + top), mask)
+    
+    def background(self, template: str) -> Image.Image:
+        """Template background, rendered once and shared (callers copy it)"""
+        return self._background(template)[0]
+    
+    def _background(self, template: str):
+        """(image, PNG scanlines, pre-compressed scanline bands) for ``template``"""
+        if template not in self._backgrounds:
+            top, bottom = PNG_TEMPLATES[template]['gradient']
+            width, height = self.size
+            ramp = np.linspace(0.0, 1.0, height)[:, None]
+            rows = (1 - ramp) * np.array(top) + ramp * np.array(bottom)
+            pixels = np.broadcast_to(rows[:, None, :], (height, width, 3)).astype(np.uint8)
+            image = Image.fromarray(pixels, 'RGB')
+            scanlines = self._scanlines(image)
+            bands = [self._deflate_band(scanlines[start:start + PNG_BAND_ROWS])
+                     for start in range(0, height, PNG_BAND_ROWS)]
+            self._backgrounds[template] = (image, scanlines, bands)
+        return self._backgrounds[template]
+    
+    def _text(self, value) -> str:
+        """Cell text without glyphs the font lacks (most emoji)"""
+        text = self._texts.get(value)
+        if text is None:
+            text = PNG_UNSUPPORTED_PATTERN.sub('', str(value))
+            text = ' '.join(''.join(char for char in text if self.has_glyph(char)).split())
+            self._texts.set(value, text)
+        return text
     
     @staticmethod
-    def to_excel(df: pd.DataFrame, data: Dict) -> bytes:
-        """Export to Excel with styling"""
-        try:
-            output = io.BytesIO()
-            
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                # Write main sheet
-                df.to_excel(writer, sheet_name='Schedule', index=False)
-                
-                # Get workbook and worksheet
-                workbook = writer.book
-                worksheet = writer.sheets['Schedule']
-                
-                # Define formats based on template
-                template = data.get('template', 'simple')
-                
-                if template == 'aesthetic':
-                    # Aesthetic format
-                    header_format = workbook.add_format({
-                        'bold': True,
-                        'text_wrap': True,
-                        'valign': 'center',
-                        'align': 'center',
-                        'fg_color': '#FF6B9D',
-                        'font_color': 'white',
-                        'border': 1,
-                        'font_size': 12
-                    })
-                    
-                    cell_format = workbook.add_format({
-                        'text_wrap': True,
-                        'valign': 'center',
-                        'align': 'center',
-                        'border': 1,
-                        'fg_color': '#FFF0F5'
-                    })
-                    
-                    # Apply gradient-like effect with alternating colors
-                    alt_format = workbook.add_format({
-                        'text_wrap': True,
-                        'valign': 'center',
-                        'align': 'center',
-                        'border': 1,
-                        'fg_color': '#FFE0EC'
-                    })
-                    
-                elif template == 'minimal':
-                    # Minimal format
-                    header_format = workbook.add_format({
-                        'bold': True,
-                        'valign': 'center',
-                        'align': 'center',
-                        'fg_color': '#F5F5F5',
-                        'border': 1
-                    })
-                    
-                    cell_format = workbook.add_format({
-                        'valign': 'center',
-                        'align': 'center',
-                        'border': 1
-                    })
-                    
-                    alt_format = cell_format
-                    
-                else:
-                    # Simple format
-                    header_format = workbook.add_format({
-                        'bold': True,
-                        'border': 1
-                    })
-                    
-                    cell_format = workbook.add_format({
-                        'border': 1
-                    })
-                    
-                    alt_format = cell_format
-                
-                # Write headers
-                for col_num, value in enumerate(df.columns):
-                    worksheet.write(0, col_num, value, header_format)
-                
-                # Write data with alternating row colors for aesthetic
-                for row_num, row_data in enumerate(df.values):
-                    format_to_use = alt_format if (template == 'aesthetic' and row_num % 2 == 0) else cell_format
-                    for col_num, value in enumerate(row_data):
-                        worksheet.write(row_num + 1, col_num, str(value), format_to_use)
-                
-                # Adjust column widths
-                for i, col in enumerate(df.columns):
-                    max_length = max(df[col].astype(str).map(len).max(), len(col))
-                    worksheet.set_column(i, i, min(max_length + 2, 30))
-                
-                # Add project info sheet
-                info_df = pd.DataFrame({
-                    'Property': ['Project Name', 'Type', 'Template', 'Created'],
-                    'Value': [
-                        data.get('folder_name', 'My Plan'),
-                        data.get('plan_type', 'daily'),
-                        data.get('template', 'simple'),
-                        datetime.now().strftime('%Y-%m-%d %H:%M')
-                    ]
-                })
-                info_df.to_excel(writer, sheet_name='Info', index=False)
-            
-            output.seek(0)
-            return output.getvalue()
-            
-        except Exception as e:
-            st.error(f"Excel generation error: {e}")
-            return None
+    def _fit_widths(natural: List[float], available: float) -> List[float]:
+        """Trim only the widest columns, to a common cap, until the row fits"""
+        if sum(natural) <= available:
+            return natural
+        cap, remaining = available / len(natural), available
+        for count, width in enumerate(sorted(natural)):
+            share = remaining / (len(natural) - count)
+            if width > share:
+                cap = share
+                break
+            remaining -= width
+        return [min(width, cap) for width in natural]
+    
+    def _draw(self, df: pd.DataFrame, template: str, title: Tuple[str, str]) -> bytes:
+        template = template if template in PNG_TEMPLATES else 'simple'
+        colors = PNG_TEMPLATES[template]
+        width, height = self.size
+        margin, top, footer = 60, 420, 140
+        canvas = self.background(template).copy()
+        draw = ImageDraw.Draw(canvas)
+        
+        # Title block, below where phone clocks usually sit
+        self.text(canvas, (margin, 230), "Planify", 64, colors['text'], bold=True)
+        self.text(canvas, (margin, 302), self.fit(self._text(title[0]), width - 2 * margin, 38), 38, colors['text'])
+        self.text(canvas, (margin, 350), f"{title[1].title()} Schedule", 28, colors['text'])
+        
+        # Pick the largest font size at which the visible rows fit the width
+        columns = [str(col) for col in df.columns]
+        cells = [[self._text(value) for value in df[col].to_numpy(dtype=object, na_value='')] for col in df.columns]
+        available = width - 2 * margin
+        for size in PNG_FONT_SIZES:
+            row_height = int(size * 1.9)
+            visible = max(0, min(len(df), (height - top - footer) // row_height - 1))
+            natural = [max([self.text_width(name, size, True)] + [self.text_width(text, size) for text in values[:visible]]) + size
+                       for name, values in zip(columns, cells)]
+            if sum(natural) <= available:
+                break
+        widths = self._fit_widths(natural, available)
+        
+        # Header
+        draw.rectangle((margin, top, width - margin, top + row_height), fill=colors['header'])
+        x = margin
+        for name, col_width in zip(columns, widths):
+            self.text(canvas, (x + size / 2, top + row_height / 2), self.fit(name, col_width - size, size, True),
+                      size, colors['header_text'], bold=True)
+            x += col_width
+        
+        # Rows
+        for i in range(visible):
+            y = top + (i + 1) * row_height
+            if colors['band'] and i % 2:
+                draw.rectangle((margin, y, width - margin, y + row_height), fill=colors['band'])
+            if colors['rule']:
+                draw.line((margin, y + row_height, width - margin, y + row_height), fill=colors['rule'], width=1)
+            x = margin
+            for values, col_width in zip(cells, widths):
+                self.text(canvas, (x + size / 2, y + row_height / 2), self.fit(values[i], col_width - size, size),
+                          size, colors['text'])
+                x += col_width
+        
+        if visible < len(df):
+            more = f"+ {len(df) - visible} more in your full planner"
+            self.text(canvas, (margin, top + (visible + 1.5) * row_height + 20), more, 24, colors['text'])
+        self.text(canvas, (width / 2, height - footer / 2), "Made with Planify", 24, colors['text'], anchor='mm')
+        
+        return self._encode_png(canvas, template)
     
     @staticmethod
-    def to_csv(df: pd.DataFrame) -> bytes:
-        """Export to CSV"""
-        try:
-            return df.to_csv(index=False).encode('utf-8')
-        except Exception as e:
-            st.error(f"CSV generation error: {e}")
-            return None
+    def _scanlines(image: Image.Image) -> np.ndarray:
+        """Unfiltered PNG scanlines: a zero filter byte before each RGB row"""
+        width, height = image.size
+        scanlines = np.empty((height, width * 3 + 1), dtype=np.uint8)
+        scanlines[:, 0] = 0
+        scanlines[:, 1:] = np.frombuffer(image.tobytes(), dtype=np.uint8).reshape(height, width * 3)
+        return scanlines
+    
+    @staticmethod
+    def _deflate_band(scanlines: np.ndarray) -> bytes:
+        """Raw deflate blocks for a run of scanlines, flushed to a byte
+        boundary so bands from different images can be concatenated"""
+        compressor = zlib.compressobj(1, zlib.DEFLATED, -15)
+        return compressor.compress(scanlines) + compressor.flush(zlib.Z_FULL_FLUSH)
+    
+    def _encode_png(self, image: Image.Image, template: str) -> bytes:
+        """Minimal RGB PNG writer reusing the background's compressed bands
+        
+        Only bands that differ from the template background are deflated;
+        untouched ones are copied from the cache, so most of a wallpaper
+        costs nothing to compress.
+        """
+        width, height = image.size
+        _, background, bands = self._background(template)
+        scanlines = self._scanlines(image)
+        
+        stream = [b'\x78\x01']
+        for band, start in enumerate(range(0, height, PNG_BAND_ROWS)):
+            rows = scanlines[start:start + PNG_BAND_ROWS]
+            if np.array_equal(rows, background[start:start + PNG_BAND_ROWS]):
+                stream.append(bands[band])
+            else:
+                stream.append(self._deflate_band(rows))
+        stream.append(zlib.compressobj(1, zlib.DEFLATED, -15).flush())
+        stream.append(struct.pack('>I', zlib.adler32(scanlines)))
+        
+        def chunk(kind: bytes, body: bytes) -> bytes:
+            return struct.pack('>I', len(body)) + kind + body + struct.pack('>I', zlib.crc32(kind + body))
+        
+        return (b'\x89PNG\r\n\x1a\n'
+                + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+                + chunk(b'IDAT', b''.join(stream))
+                + chunk(b'IEND', b''))
+
+@st.cache_resource(show_spinner=False)
+def get_png_renderer() -> PngRenderer:
+    return PngRenderer()
+
+def _run_exporter(fmt: str, df: pd.DataFrame, data: Dict, style: Optional[StyleSpec]) -> Tuple[Optional[bytes], float]:
+    """Pool task: one export plus its wall-clock time"""
+    started = time.perf_counter()
+    payload = ExportManager.export(fmt, df, data, style)
+    return payload, time.perf_counter() - started
+
+class ExportPipeline:
+    """Produce several export formats concurrently
+    
+    submit() returns one future per format, in EXPORT_FORMATS order, that
+    resolves to the export bytes or raises the exporter's error. Formats already in the
+    PlanCache resolve immediately; fresh results are stored there and
+    their durations recorded in ``timings``. Any concurrent.futures
+    executor works; a ProcessPoolExecutor helps headless callers because
+    the exporters are CPU bound.
+    """
+    
+    def __init__(self, executor: concurrent.futures.Executor = None, cache: Optional[PlanCache] = None):
+        self.executor = executor or get_export_executor()
+        self.cache = cache
+        self.timings = {}
+    
+    def submit(self, df: pd.DataFrame, data: Dict, style: Optional[StyleSpec] = None,
+               formats: Iterable[str] = None, plan_key: Optional[str] = None) -> Dict[str, concurrent.futures.Future]:
+        futures = {}
+        for fmt in formats or EXPORT_FORMATS:
+            future = concurrent.futures.Future()
+            cached = self.cache.lookup(fmt, plan_key, data) if self.cache and plan_key else None
+            if cached is not None:
+                self.timings[fmt] = 0.0
+                future.set_result(cached)
+            else:
+                task = self.executor.submit(_run_exporter, fmt, df, data, style)
+                task.add_done_callback(lambda task, fmt=fmt, future=future: self._finish(fmt, task, future, data, plan_key))
+            futures[fmt] = future
+        return futures
+    
+    def _finish(self, fmt: str, task: concurrent.futures.Future, future: concurrent.futures.Future,
+                data: Dict, plan_key: Optional[str]):
+        if task.exception() is not None:
+            future.set_exception(task.exception())
+            return
+        payload, elapsed = task.result()
+        self.timings[fmt] = elapsed
+        if self.cache and plan_key:
+            self.cache.store(fmt, plan_key, data, payload)
+        future.set_result(payload)
+
+@st.cache_resource(show_spinner=False)
+def get_export_executor() -> concurrent.futures.ThreadPoolExecutor:
+    return concurrent.futures.ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix='planify-export')
+
+def bundle_entry(archive: zipfile.ZipFile, stem: str, fmt: str, payload: bytes):
+    """Add one export to a zip bundle as ``<stem>_planner.<extension>``"""
+    info = zipfile.ZipInfo(f"{stem}_planner.{EXPORT_FORMATS[fmt]['extension']}",
+                           date_time=datetime.now().timetuple()[:6])
+    info.compress_type = zipfile.ZIP_STORED if fmt in ZIP_STORED_FORMATS else zipfile.ZIP_DEFLATED
+    archive.writestr(info, payload)
+
+def _write_bundle(archive: zipfile.ZipFile, futures: Dict[str, concurrent.futures.Future], stem: str):
+    """Write each format into the archive as soon as its exporter finishes
+    
+    Futures are released as they are consumed, so at most the payloads
+    still in flight are held in memory, never the whole bundle.
+    """
+    formats = {future: fmt for fmt, future in futures.items()}
+    futures.clear()
+    for future in concurrent.futures.as_completed(formats):
+        fmt = formats.pop(future)
+        payload = future.result()
+        if payload:
+            bundle_entry(archive, stem, fmt, payload)
+
+def export_bundle(df: pd.DataFrame, data: Dict, style: Optional[StyleSpec] = None,
+                  sink: Optional[BinaryIO] = None, formats: Iterable[str] = None,
+                  pipeline: Optional[ExportPipeline] = None) -> bytes:
+    """Zip every export format of one plan into a single download
+    
+    Formats run concurrently through an ExportPipeline and each file is
+    appended in completion order. With ``sink`` (any writable binary file,
+    seekable or not) the archive is streamed there and the sink returned.
+    """
+    output = sink if sink is not None else io.BytesIO()
+    pipeline = pipeline or ExportPipeline()
+    stem = ExportManager._file_stem(data.get('folder_name', 'My Plan'))
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+        _write_bundle(archive, pipeline.submit(df, data, style, formats), stem)
+    return output if sink is not None else output.getvalue()
+
+def export_class_bundle(batch: Iterable[Dict], sink: BinaryIO, formats: Iterable[str] = None,
+                        processes: int = None, style: Optional[StyleSpec] = None) -> BinaryIO:
+    """Stream a whole roster's bundles into one archive, a folder per student
+    
+    Plans come from iter_schedules; each student's formats are exported
+    concurrently, written under ``<student>/`` and dropped before the next
+    student starts, so memory stays flat for rosters of any size.
+    """
+    pipeline = ExportPipeline()
+    formats = list(formats or EXPORT_FORMATS)
+    batch, inputs = itertools.tee(batch)
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for (student, frame), data in zip(iter_schedules(batch, processes), inputs):
+            stem = ExportManager._file_stem(student)
+            data = {**data, 'student_id': student, 'folder_name': data.get('folder_name', student)}
+            _write_bundle(archive, pipeline.submit(frame, data, style, formats), f'{stem}/{stem}')
+    return sink
 
 # ==================== UI COMPONENTS ====================
 def show_loader(message: str = "Processing...", duration: float = 2):
@@ -1014,6 +3478,21 @@ def show_loader(message: str = "Processing...", duration: float = 2):
     time.sleep(duration)
     placeholder.empty()
 
+def stream_bot_message(chunks: Iterator[str]) -> str:
+    """Render a bot message that fills in as deltas arrive
+    
+    Model output is escaped; only our own wrapper markup is HTML.
+    """
+    placeholder = st.empty()
+    text = ""
+    for delta in chunks:
+        text += delta
+        placeholder.markdown(f'<div class="chat-message bot-message">{html.escape(text)}▌</div>', 
+                             unsafe_allow_html=True)
+    placeholder.markdown(f'<div class="chat-message bot-message">{html.escape(text)}</div>', 
+                         unsafe_allow_html=True)
+    return text
+
 def show_hero_section():
     """Display hero section"""
     st.markdown("""
@@ -1087,8 +3566,6 @@ def init_session_state():
             'template': '',
             'generated_plan': None
         }
-    if 'ai_provider' not in st.session_state:
-        st.session_state.ai_provider = AIProvider()
     if 'conversation_context' not in st.session_state:
         st.session_state.conversation_context = []
 
@@ -1113,10 +3590,10 @@ def main():
         # Display chat messages
         for msg in st.session_state.messages:
             if msg["role"] == "assistant":
-                st.markdown(f'<div class="chat-message bot-message">{msg["content"]}</div>', 
+                st.markdown(f'<div class="chat-message bot-message">{html.escape(msg["content"])}</div>', 
                           unsafe_allow_html=True)
             else:
-                st.markdown(f'<div class="chat-message user-message">{msg["content"]}</div>', 
+                st.markdown(f'<div class="chat-message user-message">{html.escape(msg["content"])}</div>', 
                           unsafe_allow_html=True)
         
         # Step 1: Project Name
@@ -1151,7 +3628,7 @@ def main():
         elif st.session_state.step == 2:
             st.markdown("### Choose Your Planning Style")
             
-            col1, col2, col3 = st.columns(3)
+            col1, col2, col3, col4 = st.columns(4)
             
             with col1:
                 st.markdown("""
@@ -1206,6 +3683,29 @@ def main():
                     st.session_state.messages.append({"role": "assistant", "content": response})
                     st.session_state.step = 3
                     st.rerun()
+            
+            with col4:
+                st.markdown("""
+                <div style="text-align: center; padding: 1rem;">
+                    <h1 style="font-size: 48px; margin: 0;">🎯</h1>
+                    <h4>Exam Planner</h4>
+                    <p style="color: var(--text-secondary); font-size: 14px;">
+                        Day-by-day sessions and reviews up to your exam
+                    </p>
+                </div>
+                """, unsafe_allow_html=True)
+                tomorrow = datetime.now().date() + timedelta(days=1)
+                exam_date = st.date_input("Exam date", value=tomorrow + timedelta(weeks=8),
+                                          min_value=tomorrow, key="exam_date_input")
+                if st.button("Choose Exam", key="horizon", use_container_width=True):
+                    st.session_state.project_data['plan_type'] = 'horizon'
+                    st.session_state.project_data['exam_date'] = exam_date.isoformat()
+                    st.session_state.messages.append({"role": "user",
+                                                     "content": f"Exam planner for {exam_date:%d %B %Y}"})
+                    response = "Smart move! I'll spread new topics and spaced reviews over the days before your exam. What challenges do you face in your studies?"
+                    st.session_state.messages.append({"role": "assistant", "content": response})
+                    st.session_state.step = 3
+                    st.rerun()
         
         # Step 3: Problem/Challenge
         elif st.session_state.step == 3:
@@ -1222,7 +3722,19 @@ def main():
                 if problem:
                     st.session_state.project_data['problem'] = problem
                     st.session_state.messages.append({"role": "user", "content": problem})
-                    response = "I understand your challenges. I'll make sure your plan addresses these issues. Now, let's talk about your daily routine. What time do you usually wake up?"
+                    st.markdown(f'<div class="chat-message user-message">{html.escape(problem)}</div>', 
+                              unsafe_allow_html=True)
+                    
+                    # Stream the acknowledgement so the reply starts appearing right away
+                    prompt = (f"A student describes their study problem: {problem}. "
+                              "Acknowledge it warmly in two short sentences with one practical tip.")
+                    follow_up = " Now, let's talk about your daily routine. What time do you usually wake up?"
+                    chunks = get_async_ai_provider().chat_stream(prompt, st.session_state.conversation_context)
+                    response = stream_bot_message(itertools.chain(chunks, [follow_up]))
+                    st.session_state.conversation_context.extend([
+                        {"role": "user", "content": prompt},
+                        {"role": "assistant", "content": response}
+                    ])
                     st.session_state.messages.append({"role": "assistant", "content": response})
                     st.session_state.step = 4
                     st.rerun()
@@ -1400,23 +3912,34 @@ def main():
         
         # Step 7: Generate Schedule
         elif st.session_state.step == 7:
-            # Show loader
-            show_loader("✨ Creating your personalized planner...", 3)
-            
-            # Generate schedule
             generator = ScheduleGenerator()
-            schedule_df = generator.create_schedule(st.session_state.project_data)
+            plan_cache = get_plan_cache()
+            data = st.session_state.project_data
             
-            # Apply template styling
-            styler = TemplateStyler()
-            styled_df = styler.apply_style(schedule_df, st.session_state.project_data['template'])
+            # Generate the schedule once; edits below clear it so it is rebuilt
+            if data['generated_plan'] is None:
+                if not plan_cache.has_schedule(data):
+                    show_loader("✨ Creating your personalized planner...", 3)
+                data['generated_plan'] = plan_cache.schedule(data, lambda: generator.create_plan(data))
             
-            # Store generated plan
-            st.session_state.project_data['generated_plan'] = styled_df
+            # The session keeps the compact typed plan; display strings are derived per render
+            plan = data['generated_plan']
+            schedule_df = display_plan(plan)
+            # Keyed on the display frame, like headless exports, so both decorate it alike
+            plan_key = plan_fingerprint(schedule_df)
+            
+            # Template styling is applied whenever the plan is rendered
+            style = TemplateStyler.spec(data['template'], plan_key)
             
             # Show success message
             show_success_message("Your Planner is Ready!")
             
+            # Subjects the allocator could not fit into the day
+            unplaced = plan.attrs.get('unplaced')
+            if unplaced:
+                st.warning(f"⚠️ No free time left for: {', '.join(unplaced)}. "
+                           "Shorten your sessions or adjust your routine to fit them in.")
+            
             # Display the schedule
             st.markdown("### 📊 Your Personalized Schedule")
             
@@ -1431,46 +3954,93 @@ def main():
                 </style>
                 """, unsafe_allow_html=True)
             
-            st.dataframe(styled_df, use_container_width=True, height=400)
+            st.dataframe(style.apply(schedule_df), use_container_width=True, height=400)
+            
+            # Quick adjustments without restarting the wizard
+            if st.session_state.project_data['plan_type'] == 'daily':
+                with st.expander("⏱️ Adjust Your Day"):
+                    routine_fields = {
+                        "Wake up": ('wake_time', "07:00"),
+                        "Breakfast": ('breakfast_time', "08:00"),
+                        "Lunch": ('lunch_time', "13:00"),
+                        "Dinner": ('dinner_time', "19:30"),
+                        "Sleep": ('sleep_time', "22:30")
+                    }
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        moved = st.selectbox("What changed?", list(routine_fields), key="adjust_field")
+                    field, default = routine_fields[moved]
+                    current = st.session_state.project_data['routine'].get(field, default)
+                    with col2:
+                        new_time = st.time_input("New time", value=datetime.strptime(current, "%H:%M").time(),
+                                                 key=f"adjust_{field}")
+                    new_subject = st.text_input("Add a subject (optional)", key="adjust_subject")
+                    
+                    if st.button("Update Plan", key="adjust_btn"):
+                        data['routine'] = {**data['routine'], field: new_time.strftime("%H:%M")}
+                        if new_subject.strip():
+                            data['subjects'] = data['subjects'] + [new_subject.strip()]
+                        data['generated_plan'] = None
+                        st.rerun()
             
             # Export options
             st.markdown("### 💾 Download Your Planner")
             
-            export_mgr = ExportManager()
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                pdf_bytes = export_mgr.to_pdf(styled_df, st.session_state.project_data)
-                if pdf_bytes:
-                    st.download_button(
-                        label="📄 Download PDF",
-                        data=pdf_bytes,
-                        file_name=f"{st.session_state.project_data['folder_name']}_planner.pdf",
-                        mime="application/pdf",
-                        use_container_width=True
-                    )
+            # Exports run concurrently; each button appears once its file is ready
+            pipeline = ExportPipeline(cache=plan_cache)
+            futures = pipeline.submit(schedule_df, data, style, plan_key=plan_key)
+            slots = {}
+            for fmt, col in zip(futures, st.columns(len(futures))):
+                slots[fmt] = col.empty()
+                slots[fmt].caption(f"⏳ Preparing {EXPORT_FORMATS[fmt]['extension'].upper()}...")
             
-            with col2:
-                excel_bytes = export_mgr.to_excel(styled_df, st.session_state.project_data)
-                if excel_bytes:
-                    st.download_button(
-                        label="📊 Download Excel",
-                        data=excel_bytes,
-                        file_name=f"{st.session_state.project_data['folder_name']}_planner.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                        use_container_width=True
-                    )
+            # The bundle is filled in as each file arrives, unless a rerun already built it
+            bundle_data = {**data, 'formats': list(futures)}
+            bundle = plan_cache.lookup('bundle', plan_key, bundle_data)
+            archive = None
+            if bundle is None:
+                buffer = io.BytesIO()
+                archive = zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED)
+            stem = ExportManager._file_stem(data['folder_name'])
             
-            with col3:
-                csv_bytes = export_mgr.to_csv(styled_df)
-                if csv_bytes:
-                    st.download_button(
-                        label="📋 Download CSV",
-                        data=csv_bytes,
-                        file_name=f"{st.session_state.project_data['folder_name']}_planner.csv",
-                        mime="text/csv",
+            formats = {future: fmt for fmt, future in futures.items()}
+            complete = True
+            for future in concurrent.futures.as_completed(formats):
+                fmt = formats[future]
+                export = EXPORT_FORMATS[fmt]
+                try:
+                    payload = future.result()
+                except Exception as e:
+                    payload = None
+                    st.error(f"{export['extension'].upper()} generation error: {e}")
+                if payload:
+                    if archive is not None:
+                        bundle_entry(archive, stem, fmt, payload)
+                    slots[fmt].download_button(
+                        label=export['label'],
+                        data=payload,
+                        file_name=f"{data['folder_name']}_planner.{export['extension']}",
+                        mime=export['mime'],
                         use_container_width=True
                     )
+                else:
+                    slots[fmt].caption(f"⚠️ {export['extension'].upper()} export unavailable")
+                    complete = False
+            if archive is not None:
+                archive.close()
+                bundle = buffer.getvalue()
+                # Only complete bundles are kept; failed formats are retried next run
+                if complete:
+                    plan_cache.store('bundle', plan_key, bundle_data, bundle)
+            st.download_button(
+                label="📦 Download Everything (ZIP)",
+                data=bundle,
+                file_name=f"{data['folder_name']}_planner.zip",
+                mime="application/zip",
+                use_container_width=True
+            )
+            st.caption("⏱️ " + " · ".join(f"{EXPORT_FORMATS[fmt]['extension'].upper()} {seconds:.2f}s"
+                                         for fmt, seconds in pipeline.timings.items()))
             
             # Reset button
             st.markdown("---")
@@ -1489,6 +4059,9 @@ def main():
         st.metric("Progress", f"{progress:.0f}%")
         st.progress(progress / 100)
         
+        # AI connection status
+        st.caption(get_ai_provider().status)
+        
         st.markdown("---")
         
         # Quick actions
@@ -0,0 +1,344 @@
+"""
+Planify - Performance Benchmarks
+
+Usage: python benchmarks.py [benchmark ...]
+"""
+
+import gc
+import io
+import os
+import sys
+import time
+import random
+import tracemalloc
+import warnings
+from typing import Callable, Dict, List
+
+import pandas as pd
+from docx import Document
+from fpdf import FPDF
+
+import Planify
+
+# ==================== HELPERS ====================
+def timed(func: Callable, *args, repeat: int = 3) -> float:
+    """Best wall-clock time of func(*args) in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def peak_memory(func: Callable, *args) -> float:
+    """Peak Python heap allocated while running func(*args), in MB"""
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+def report(name: str, baseline: float, current: float, unit: str = ''):
+    """Print one baseline/current comparison line"""
+    print(f"{name:<32} baseline {baseline * 1000:9.1f} ms   current {current * 1000:9.1f} ms"
+          f"   speedup {baseline / current:6.1f}x {unit}")
+
+def sample_roster(count: int, seed: int = 7) -> List[Dict]:
+    """Synthetic project_data dicts with varied routines and subjects"""
+    rng = random.Random(seed)
+    subjects = ['Mathematics', 'Physics', 'Chemistry', 'Biology', 'English', 'History', 'Geography']
+    roster = []
+    for i in range(count):
+        roster.append({
+            'student_id': f'student_{i}',
+            'folder_name': f'Plan {i}',
+            'plan_type': 'daily',
+            'template': rng.choice(['simple', 'minimal', 'aesthetic']),
+            'routine': {
+                'wake_time': f'0{rng.randint(5, 8)}:{rng.choice(["00", "30"])}',
+                'breakfast_time': '08:00',
+                'lunch_time': rng.choice(['12:30', '13:00', '13:30']),
+                'dinner_time': rng.choice(['19:00', '19:30', '20:00']),
+                'sleep_time': rng.choice(['22:00', '22:30', '23:00']),
+                'study_preference': rng.choice(['morning', 'afternoon', 'evening'])
+            },
+            'subjects': rng.sample(subjects, rng.randint(1, 5))
+        })
+    return roster
+
+def sample_plan(rows: int) -> pd.DataFrame:
+    """One long schedule frame built by stacking daily plans"""
+    plans = [Planify.ScheduleGenerator.create_schedule(data) for data in sample_roster(max(1, rows // 10))]
+    frame = pd.concat(plans, ignore_index=True)
+    return pd.concat([frame] * (rows // len(frame) + 1), ignore_index=True).head(rows)
+
+# ==================== LEGACY IMPLEMENTATIONS ====================
+def legacy_daily_schedule(data: Dict) -> pd.DataFrame:
+    """Row-by-row daily builder as it was before vectorization"""
+    routine = data.get('routine', {})
+    subjects = data.get('subjects', ['Math', 'Science', 'English'])
+    schedule = [
+        {'Time': routine.get('wake_time', '07:00'), 'Activity': '🌅 Wake Up & Morning Routine',
+         'Duration': '30 min', 'Type': 'Personal', 'Energy Level': '🔋 Building'},
+        {'Time': routine.get('breakfast_time', '08:00'), 'Activity': '🍳 Breakfast',
+         'Duration': '30 min', 'Type': 'Meal', 'Energy Level': '🔋🔋 Good'}
+    ]
+    times = ['09:00', '11:30', '14:00', '16:30', '19:00']
+    for i, time_value in enumerate(times[:len(subjects)]):
+        schedule.append({'Time': time_value, 'Activity': f'📚 Study: {subjects[i % len(subjects)]}',
+                         'Duration': '2 hours', 'Type': 'Study', 'Energy Level': '🔋🔋🔋 Peak'})
+    schedule += [
+        {'Time': routine.get('lunch_time', '13:00'), 'Activity': '🍽️ Lunch',
+         'Duration': '45 min', 'Type': 'Meal', 'Energy Level': '🔋🔋 Good'},
+        {'Time': routine.get('dinner_time', '19:30'), 'Activity': '🍝 Dinner',
+         'Duration': '45 min', 'Type': 'Meal', 'Energy Level': '🔋🔋 Good'},
+        {'Time': routine.get('sleep_time', '22:30'), 'Activity': '😴 Sleep Preparation',
+         'Duration': '30 min', 'Type': 'Personal', 'Energy Level': '🔋 Winding Down'}
+    ]
+    df = pd.DataFrame(schedule)
+    df['Time'] = pd.to_datetime(df['Time'], format='%H:%M').dt.time
+    df = df.sort_values('Time')
+    df['Time'] = df['Time'].astype(str).str[:5]
+    return df
+
+def legacy_aesthetic_style(df: pd.DataFrame) -> pd.DataFrame:
+    """Cell-by-cell aesthetic styling on the global RNG"""
+    styled_df = df.copy()
+    emoji_decorations = ['✨', '🌟', '💫', '⭐', '🌈']
+    for col in styled_df.columns:
+        if col not in ['Time', 'Day', 'Week']:
+            for idx in styled_df.index:
+                if random.random() > 0.7:
+                    current_val = str(styled_df.at[idx, col])
+                    decoration = random.choice(emoji_decorations)
+                    styled_df.at[idx, col] = f"{current_val} {decoration}"
+    return styled_df
+
+def legacy_minimal_style(df: pd.DataFrame) -> pd.DataFrame:
+    """Per-column regex replace over every column, numeric ones included"""
+    styled_df = df.copy()
+    for col in styled_df.columns:
+        styled_df[col] = styled_df[col].astype(str).str.replace(r'[^\w\s:]', '', regex=True)
+    return styled_df
+
+def legacy_pdf(df: pd.DataFrame) -> bytes:
+    """iterrows table with truncated cells (output call patched for fpdf2)"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_auto_page_break(auto=True, margin=15)
+        pdf.set_font("Arial", 'B', 10)
+        col_width = (pdf.w - 2 * pdf.l_margin) / len(df.columns)
+        for col in df.columns:
+            pdf.cell(col_width, 10, str(col), 1, 0, 'C', True)
+        pdf.ln()
+        pdf.set_font("Arial", size=9)
+        for _, row in df.iterrows():
+            for col in df.columns:
+                value = str(row[col])
+                if len(value) > 20:
+                    value = value[:17] + "..."
+                pdf.cell(col_width, 8, value, 1, 0, 'C')
+            pdf.ln()
+        return bytes(pdf.output())
+
+def legacy_excel(df: pd.DataFrame) -> bytes:
+    """to_excel of the whole frame, every cell rewritten as str, widths per column"""
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, sheet_name='Schedule', index=False)
+        worksheet = writer.sheets['Schedule']
+        cell_format = writer.book.add_format({'border': 1})
+        for row_num, row_data in enumerate(df.values):
+            for col_num, value in enumerate(row_data):
+                worksheet.write(row_num + 1, col_num, str(value), cell_format)
+        for i, col in enumerate(df.columns):
+            max_length = max(df[col].astype(str).map(len).max(), len(col))
+            worksheet.set_column(i, i, min(max_length + 2, 30))
+    return output.getvalue()
+
+def legacy_docx(df: pd.DataFrame) -> bytes:
+    """Conventional python-docx table: add_row and per-cell text/bold calls"""
+    document = Document()
+    table = document.add_table(rows=1, cols=len(df.columns))
+    table.style = 'Table Grid'
+    for cell, col in zip(table.rows[0].cells, df.columns):
+        cell.paragraphs[0].add_run(str(col)).bold = True
+    for row in df.itertuples(index=False):
+        cells = table.add_row().cells
+        for cell, value in zip(cells, row):
+            cell.text = str(value)
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+def legacy_ics(df: pd.DataFrame, weeks: int = 16) -> bytes:
+    """Naive calendar: every daily row written out as one VEVENT per day"""
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Planify//Legacy//EN']
+    start = pd.Timestamp('2026-01-05')
+    for day in range(7 * weeks):
+        for number, (clock, activity, length) in enumerate(zip(df['Time'], df['Activity'], df['Duration'])):
+            begin = start + pd.Timedelta(days=day, minutes=Planify.clock_minutes(clock))
+            lines += ['BEGIN:VEVENT', f'UID:{day}-{number}@legacy', f'DTSTART:{begin:%Y%m%dT%H%M%S}',
+                      f'DURATION:PT{Planify.duration_minutes(length)}M', f'SUMMARY:{activity}', 'END:VEVENT']
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(lines).encode('utf-8')
+
+# ==================== BENCHMARKS ====================
+def bench_daily_schedule(plans: int = 10000):
+    """Daily plan construction for a batch of students, display frames on both sides"""
+    roster = sample_roster(plans)
+    baseline = timed(lambda: [legacy_daily_schedule(data) for data in roster], repeat=1)
+    current = timed(lambda: [Planify.ScheduleGenerator.create_schedule(data) for data in roster], repeat=1)
+    report(f"daily_schedule x{plans}", baseline, current)
+
+def bench_horizon_schedule(weeks: int = 26, subjects: int = 15):
+    """Spaced-repetition horizon plan for one long exam run-up"""
+    data = {
+        'plan_type': 'horizon',
+        'start_date': '2026-01-05',
+        'horizon_weeks': weeks,
+        'sessions_per_day': 4,
+        'subjects': [f'Subject {i + 1}' for i in range(subjects)]
+    }
+    current = timed(Planify.ScheduleGenerator.create_schedule, data)
+    rows = len(Planify.ScheduleGenerator.create_schedule(data))
+    print(f"{f'horizon {weeks}w x{subjects} subjects':<32} current {current * 1000:9.1f} ms   ({rows} sessions)")
+
+def bench_aesthetic_style(rows: int = 100000):
+    """Aesthetic template styling of one large export (plan key precomputed, as in the app)"""
+    df = sample_plan(rows)
+    plan_key = Planify.plan_fingerprint(df)
+    baseline = timed(legacy_aesthetic_style, df, repeat=1)
+    current = timed(Planify.TemplateStyler._aesthetic_style, df, plan_key)
+    report(f"aesthetic_style {rows} rows", baseline, current)
+
+def bench_minimal_style(rows: int = 100000):
+    """Minimal template styling of one large export"""
+    df = sample_plan(rows)
+    baseline = timed(legacy_minimal_style, df)
+    Planify.get_minimal_cell_cache().clear()
+    current = timed(Planify.TemplateStyler._minimal_style, df)
+    report(f"minimal_style {rows} rows", baseline, current)
+
+def bench_pdf_export(rows: int = 10000):
+    """PDF export of a long plan (minimal template, so the legacy path can draw it)"""
+    df = Planify.TemplateStyler._minimal_style(sample_plan(rows))
+    data = {'template': 'simple', 'plan_type': 'daily', 'folder_name': 'Benchmark'}
+    baseline = timed(legacy_pdf, df, repeat=1)
+    current = timed(lambda: Planify.ExportManager.to_pdf(df, data, sink=io.BytesIO()), repeat=1)
+    report(f"pdf_export {rows} rows", baseline, current)
+
+def bench_excel_export(rows: int = 100000):
+    """Excel export of one large plan: time and peak heap"""
+    df = sample_plan(rows)
+    data = {'template': 'simple', 'plan_type': 'daily', 'folder_name': 'Benchmark'}
+    current_export = lambda: Planify.ExportManager.to_excel(df, data, sink=io.BytesIO())
+    baseline = timed(legacy_excel, df, repeat=1)
+    current = timed(current_export, repeat=1)
+    report(f"excel_export {rows} rows", baseline, current)
+    print(f"{'':<32} peak heap {peak_memory(legacy_excel, df):7.1f} MB -> {peak_memory(current_export):7.1f} MB")
+
+def bench_docx_export(weeks: int = 18):
+    """Word export of a semester-long horizon plan (target: under a second)"""
+    data = {
+        'plan_type': 'horizon',
+        'template': 'aesthetic',
+        'folder_name': 'Semester',
+        'start_date': '2026-01-05',
+        'horizon_weeks': weeks,
+        'sessions_per_day': 4,
+        'subjects': [f'Subject {i + 1}' for i in range(8)]
+    }
+    df = Planify.ScheduleGenerator.create_schedule(data)
+    baseline = timed(legacy_docx, df, repeat=1)
+    current = timed(Planify.ExportManager.to_docx, df, data)
+    report(f"docx_export {weeks}w ({len(df)} rows)", baseline, current)
+
+def bench_png_export(students: int = 100):
+    """Wallpaper PNG per student for a class, then the same class again (cache hits)"""
+    roster = sample_roster(students, seed=11)
+    plans = [(Planify.ScheduleGenerator.create_schedule(data), data) for data in roster]
+    Planify.ExportManager.to_png(*plans[0])  # load fonts, render backgrounds
+    fresh = timed(lambda: [Planify.ExportManager.to_png(df, data) for df, data in plans[1:]], repeat=1)
+    cached = timed(lambda: [Planify.ExportManager.to_png(df, data) for df, data in plans[1:]], repeat=1)
+    per_image = (students - 1) / 1000
+    print(f"{f'png_export x{students - 1}':<32} fresh {fresh / per_image:7.1f} ms/image   cached {cached / per_image:7.2f} ms/image")
+
+def bench_ics_export(students: int = 200):
+    """Semester calendar per student: recurring events vs one event per occurrence"""
+    roster = [{**data, 'plan_type': 'daily', 'start_date': '2026-01-05'} for data in sample_roster(students, seed=13)]
+    plans = [(Planify.ScheduleGenerator.create_schedule(data), data) for data in roster]
+    baseline = timed(lambda: [legacy_ics(df) for df, _ in plans], repeat=1)
+    current = timed(lambda: [Planify.ExportManager.to_ics(df, data) for df, data in plans], repeat=1)
+    report(f'ics_export x{students}', baseline, current)
+    legacy_size = sum(len(legacy_ics(df)) for df, _ in plans)
+    size = sum(len(Planify.ExportManager.to_ics(df, data)) for df, data in plans)
+    print(f"{'ics_export bytes':<32} legacy {legacy_size / 1e6:7.1f} MB   current {size / 1e6:7.2f} MB")
+
+def bench_parquet_export(students: int = 2000):
+    """Warehouse ingest of a roster: re-parsing CSV strings vs reading typed Parquet"""
+    import pyarrow.parquet as pq
+    roster = [{**data, 'plan_type': 'daily'} for data in sample_roster(students, seed=17)]
+    csv = Planify.create_schedules(roster, processes=1).to_csv(index=False).encode('utf-8')
+    parquet = Planify.ExportManager.to_class_parquet(roster, io.BytesIO(), processes=1).getvalue()
+    
+    def load_csv():
+        df = pd.read_csv(io.BytesIO(csv))
+        start = df['Time'].map(Planify.clock_minutes)
+        duration = df['Duration'].map(Planify.duration_minutes)
+        return df.assign(start_minute=start, end_minute=start + duration, duration_minutes=duration)
+    
+    baseline = timed(load_csv)
+    current = timed(lambda: pq.read_table(io.BytesIO(parquet)))
+    report(f'parquet_ingest x{students}', baseline, current)
+    print(f"{'parquet_ingest bytes':<32} csv {len(csv) / 1e6:7.2f} MB   parquet {len(parquet) / 1e6:7.2f} MB")
+
+def frame_bytes(frames: List[pd.DataFrame]) -> int:
+    """Summed deep memory_usage of ``frames`` (counts Arrow-backed strings, unlike tracemalloc)"""
+    return sum(int(frame.memory_usage(deep=True).sum()) for frame in frames)
+
+def bench_plan_model(students: int = 20000):
+    """Stored plan size per session and a sort + filter: display strings vs the compact typed plan
+    
+    Sizes are summed deep memory_usage, which counts each frame's category
+    index even where plans share it. The compact model pays off on long
+    horizon plans; short daily plans are not smaller compact, since the
+    category indexes outweigh a dozen Arrow-backed string rows.
+    """
+    roster = sample_roster(students, seed=19)
+    horizon = {'plan_type': 'horizon', 'start_date': '2026-01-05', 'horizon_weeks': 26,
+               'sessions_per_day': 4, 'subjects': [f'Subject {i + 1}' for i in range(15)]}
+    for name, inputs in (('horizon 26w x200', [horizon] * 200), (f'daily x{students}', roster)):
+        strings = frame_bytes([Planify.ScheduleGenerator.create_schedule(data) for data in inputs])
+        compact = frame_bytes([Planify.ScheduleGenerator.create_plan(data) for data in inputs])
+        print(f"{f'plan_model {name} bytes/plan':<32} strings {strings / len(inputs):9.0f}   "
+              f"compact {compact / len(inputs):9.0f}   (compact is {compact / strings:.0%} of strings)")
+    
+    frames = [Planify.ScheduleGenerator.create_schedule(horizon)] * 20
+    plans = [Planify.ScheduleGenerator.create_plan(horizon)] * 20
+    baseline = timed(lambda: [frame[frame['Phase'] == 'Revision'].sort_values(['Subject', 'Date', 'Duration'])
+                              for frame in frames])
+    current = timed(lambda: [plan[plan['Phase'] == 'Revision'].sort_values(['Subject', 'Date', 'Minutes'])
+                             for plan in plans])
+    report('plan_model filter+sort x20', baseline, current)
+
+BENCHMARKS = {
+    'daily_schedule': bench_daily_schedule,
+    'horizon_schedule': bench_horizon_schedule,
+    'aesthetic_style': bench_aesthetic_style,
+    'minimal_style': bench_minimal_style,
+    'pdf_export': bench_pdf_export,
+    'excel_export': bench_excel_export,
+    'docx_export': bench_docx_export,
+    'png_export': bench_png_export,
+    'ics_export': bench_ics_export,
+    'parquet_export': bench_parquet_export,
+    'plan_model': bench_plan_model
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()